@@ -1,164 +1,277 @@
-from flask import Flask, request, jsonify
-from flasgger import Swagger
+from flask import Blueprint, Flask, Response, request, jsonify, g, has_app_context
 from flask_cors import CORS
-import sqlite3
+import click
+import csv
+import heapq
+import io
+import json
 import os
-import requests
+import re
+import sqlite3
+from bisect import bisect_right
+from collections import Counter
 from datetime import datetime
-
-app = Flask(__name__)
-CORS(app)
-
-# Usa arquivo swagger.yaml como template principal da documentação
-swagger = Swagger(app, template_file="swagger.yaml")
+from itertools import islice
+
+from banco import pool
+from catalogo import catalogo, gerar_etag
+from compressao import guardar_comprimida, habilitar_compressao
+from escrita_adiada import ESCRITA_ADIADA, escrita_adiada
+from shards import SHARDS, ler_total_gravado, rebalancear, shards
+from snapshot_leitura import SNAPSHOT_LEITURA, snapshot_leitura
+from serializacao import ProvedorJSON, como_dicts, cursor_de_tuplas, serializar
+from migracoes import aplicar_migracoes
+from metricas import instrumentar
+from verificadores import normalizar, verificar
+from cache_roboteca import cache_roboteca, gerar_chave
+from indice_roboteca import ROBOTECA_INDICE, indice_roboteca
+from groq_client import ErroGroq, SobrecargaGroq, cliente_groq, controle_groq
+
+# Todas as rotas ficam neste blueprint; a aplicação é montada em create_app()
+api = Blueprint("api", __name__)
+
+
+# --- FÁBRICA DA APLICAÇÃO ---
+# Documentação Swagger ligada por padrão; CODEBRINCANDO_DOCS=0 nem importa o flasgger
+DOCS_HABILITADAS = os.getenv("CODEBRINCANDO_DOCS", "1") != "0"
+
+# Spec OpenAPI pré-compilada pelo comando `flask --app app gerar-spec`
+SPEC_PRONTA = os.getenv(
+    "CODEBRINCANDO_SPEC",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "apispec.json")
+)
+ROTA_SPEC = "/apispec_1.json"
+
+
+def create_app(usar_spec_pronta=True):
+    """
+    Monta a aplicação Flask. Não mexe no banco: o init_db() roda uma vez só,
+    antes dos workers nascerem (ver gunicorn.conf.py), ou no `python app.py`.
+    """
+    app = Flask(__name__)
+    app.json = ProvedorJSON(app)
+    CORS(app)
+
+    if DOCS_HABILITADAS:
+        registrar_documentacao(app, usar_spec_pronta)
+    elif usar_spec_pronta and os.path.exists(SPEC_PRONTA):
+        registrar_spec_pronta(app)
+
+    app.register_blueprint(api)
+    app.teardown_appcontext(liberar_db_conn)
+    app.cli.add_command(gerar_spec)
+    app.cli.add_command(rebalancear_shards)
+    instrumentar(app)
+    # Depois das métricas: os after_request rodam na ordem inversa, então a
+    # compressão entra na duração medida
+    habilitar_compressao(app)
+    return app
+
+
+def registrar_documentacao(app, usar_spec_pronta=True):
+    """
+    Liga o Swagger UI em /apidocs/. Se existir a spec pré-compilada ela é usada
+    como está; senão o flasgger lê o swagger.yaml e os docstrings das rotas.
+    """
+    from flasgger import Swagger
+
+    if usar_spec_pronta and os.path.exists(SPEC_PRONTA):
+        with open(SPEC_PRONTA, encoding="utf-8") as arquivo:
+            spec = json.load(arquivo)
+        config = dict(Swagger.DEFAULT_CONFIG)
+        config["specs"] = [{
+            "endpoint": "apispec_1",
+            "route": ROTA_SPEC,
+            # Nenhum docstring é lido: tudo já está na spec
+            "rule_filter": lambda rule: False,
+            "model_filter": lambda tag: False,
+        }]
+        Swagger(app, template=spec, config=config, merge=False)
+    else:
+        # Usa arquivo swagger.yaml como template principal da documentação
+        Swagger(app, template_file="swagger.yaml")
+
+
+def registrar_spec_pronta(app):
+    """Sem Swagger UI: só entrega o JSON pré-compilado, sem importar o flasgger."""
+    with open(SPEC_PRONTA, "rb") as arquivo:
+        corpo = arquivo.read()
+    etag = gerar_etag(corpo)
+
+    def apispec():
+        return guardar_comprimida(resposta_com_etag(etag, lambda: corpo))
+
+    app.add_url_rule(ROTA_SPEC, "apispec_1", apispec, methods=["GET"])
+
+
+@click.command("gerar-spec")
+@click.option("--saida", default=SPEC_PRONTA, show_default=True,
+              help="Arquivo JSON onde a spec será gravada.")
+def gerar_spec(saida):
+    """Compila swagger.yaml + docstrings das rotas em uma spec JSON estática."""
+    app = create_app(usar_spec_pronta=False)
+    if not DOCS_HABILITADAS:
+        registrar_documentacao(app, usar_spec_pronta=False)
+
+    resposta = app.test_client().get(ROTA_SPEC)
+    spec = resposta.get_json()
+    with open(saida, "w", encoding="utf-8") as arquivo:
+        json.dump(spec, arquivo, ensure_ascii=False, indent=2, sort_keys=True)
+    click.echo(f"Spec com {len(spec.get('paths', {}))} rotas gravada em {saida}")
+
+
+@click.command("rebalancear-shards")
+@click.option("--para", type=click.IntRange(min=1), required=True,
+              help="Novo número de shards (o mesmo de CODEBRINCANDO_SHARDS).")
+@click.option("--lote", type=click.IntRange(min=1), default=1000, show_default=True,
+              help="Linhas de progresso lidas por vez de cada arquivo.")
+def rebalancear_shards(para, lote):
+    """Redistribui o progresso entre os arquivos de shard (com a API parada)."""
+    conn = pool.obter()
+    try:
+        aplicar_migracoes(conn)
+    finally:
+        pool.devolver(conn)
+    rebalancear(para, tamanho_lote=lote, avisar=click.echo)
 
 
 # --- FUNÇÕES DE BANCO DE DADOS ---
 def get_db_conn():
-    conn = sqlite3.connect('database.db')
-    conn.row_factory = sqlite3.Row
-    return conn
+    """
+    Retorna a conexão da requisição atual.
 
+    Dentro de uma requisição a conexão vem do pool e fica guardada em `g`,
+    sendo devolvida automaticamente no fim do app context. Fora de uma
+    requisição quem chama precisa devolver com `pool.devolver(conn)`.
+    """
+    if not has_app_context():
+        return pool.obter()
 
-def init_db():
-    conn = get_db_conn()
-    cursor = conn.cursor()
+    if "db_conn" not in g:
+        g.db_conn = pool.obter()
+    return g.db_conn
 
-    # ATENÇÃO: em desenvolvimento, apagamos as tabelas para recriar
-    cursor.execute("DROP TABLE IF EXISTS usuarios")
-    cursor.execute("DROP TABLE IF EXISTS desafios")
-    cursor.execute("DROP TABLE IF EXISTS progresso_usuarios")
-    cursor.execute("DROP TABLE IF EXISTS explicacoes")
-
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS usuarios (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            nome TEXT NOT NULL,
-            idade INTEGER
-        );
-    """)
-
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS desafios (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            nome TEXT NOT NULL,
-            linguagem TEXT NOT NULL,
-            instrucao TEXT NOT NULL,
-            codigo_bugado TEXT NOT NULL,
-            codigo_esperado TEXT NOT NULL
-        );
-    """)
-
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS progresso_usuarios (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            usuario_id INTEGER NOT NULL,
-            desafio_id INTEGER NOT NULL,
-            status TEXT NOT NULL DEFAULT 'pendente',
-            data_conclusao DATETIME,
-            FOREIGN KEY (usuario_id) REFERENCES usuarios (id),
-            FOREIGN KEY (desafio_id) REFERENCES desafios (id)
-        );
-    """)
-
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS explicacoes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            tipo TEXT NOT NULL,
-            titulo TEXT NOT NULL,
-            texto TEXT NOT NULL,
-            codigo TEXT
-        );
-    """)
-
-    # Desafios iniciais
-    if cursor.execute("SELECT COUNT(*) FROM desafios").fetchone()[0] == 0:
-        desafios_iniciais = [
-            (
-                'O Título Sumiu!',
-                'html',
-                'Para um título grandão, usamos a tag &lt;h1&gt;. Toda tag que é aberta precisa ser fechada com uma barra, assim: &lt;/h1&gt;. <br><br> DESAFIO <br> Nosso mascote queria escrever um título grande com a frase "Olá, Mundo!", o código dele foi: <br><br> &lt;titul0&gt;Olá, Mundo!&lt;/titul0&gt;  <br><br> O código do nosso mascote não está aparecendo, você consegue nos ajudar?',
-                '<titul0>Olá, Mundo!</titul0>',
-                '<h1>Olá, Mundo!</h1>'
-            ),
-            (
-                'Parágrafo Tímido',
-                'html',
-                'A tag de parágrafo é a &lt;p&gt; e também precisa ser aberta e fechada para funcionar! <br><br> DESAFIO <br> O parágrafo do nosso mascote não foi fechado e ficou assim: <br><br> &lt;p&gt;Meu animal favorito é o golfinho!. <br><br> Você consegue nos ajudar?',
-                '<p>Meu animal favorito é o golfinho!',
-                '<p>Meu animal favorito é o golfinho!</p>'
-            ),
-            (
-                'O Site não Pinta!',
-                'css',
-                'Para mudar a cor de fundo, a ordem que devemos dar ao computador é "background-color".<br> Se usarmos só "color", ele pinta o texto!<br><br> DESAFIO <br> O código do nosso mascote foi:<br><br>body { color: lightblue; } <br><br> O resultado desse codigo foi texto ficar azul. <br> Você consegue nos ajudar de novo e escrever um código que pinte apenas o fundo (background) de azul?',
-                'body { color: lightblue; }',
-                'body { background-color: lightblue; }'
-            )
-        ]
-        cursor.executemany(
-            'INSERT INTO desafios (nome, linguagem, instrucao, codigo_bugado, codigo_esperado) VALUES (?, ?, ?, ?, ?)',
-            desafios_iniciais
-        )
 
-    # Explicações iniciais
-    if cursor.execute("SELECT COUNT(*) FROM explicacoes").fetchone()[0] == 0:
-        explicacoes_iniciais = [
-            (
-                'intro',
-                "Ei, você, você mesmo!!",
-                "Vamos aprender um pouco de Engenharia de Software?\nJuro que é muito mais simples do que parece!\n\nTeremos 5 conceitos para começar...",
-                None
-            ),
-            (
-                'conceito',
-                "1. O que é um site?",
-                "Um site é como uma casinha que vive dentro do computador! Quando você entra em um site, é como visitar essa casa. Ela pode ter portas (links), quadros na parede (imagens), recados colados na geladeira (textos) e até botões que fazem coisas acontecerem (tipo uma campainha que toca)!",
-                None
-            ),
-            (
-                'conceito',
-                "2. O que é HTML? (a estrutura)",
-                "O HTML é como o esqueleto da casa. Ele diz onde vai o título, a imagem, o botão, a lista… É tipo montar uma lancheira com divisórias: um espaço pro sanduíche, outro pro suco, outro pra sobremesa.",
-                '<h1>Olá, mundo!</h1>\n<p>Este é o meu primeiro site!</p>'
-            ),
-            (
-                'conceito',
-                "3. O que é CSS? (o visual)",
-                "CSS é o que deixa o site bonito! Ele pinta as paredes, escolhe a fonte do texto, muda o tamanho das coisas e até coloca brilhos e animações. É como colocar roupas e maquiagem no seu personagem!",
-                'p {\n  color: blue;\n  font-size: 20px;\n}'
-            ),
-            (
-                'conceito',
-                "4. O que é JavaScript? (o cérebro)",
-                "O JavaScript é o que dá vida ao site! Ele faz as coisas se mexerem, responderem quando você clica, mudarem sozinhas. É como o cérebro de um robô que reage quando você fala com ele.",
-                'alert("Bem-vindo ao meu site!");'
-            ),
-            (
-                'conceito',
-                "5. O que é um Bug?",
-                "Um bug é quando o código não funciona direitinho. Pode ser porque esquecemos um pedacinho, escrevemos uma palavrinha errada, ou colocamos tudo na ordem errada. É como montar um LEGO e perceber que a roda está do lado errado.",
-                None
-            )
-        ]
-        cursor.executemany(
-            'INSERT INTO explicacoes (tipo, titulo, texto, codigo) VALUES (?, ?, ?, ?)',
-            explicacoes_iniciais
-        )
+def get_db_leitura():
+    """
+    Conexão para as rotas de agregados (/estatisticas/*, /ranking). Com
+    CODEBRINCANDO_SNAPSHOT_LEITURA=1 vem da cópia em memória das tabelas que
+    elas leem (ver snapshot_leitura.py), que pode estar alguns milissegundos
+    atrasada; senão é a mesma de get_db_conn().
+    """
+    if not SNAPSHOT_LEITURA or not has_app_context():
+        return get_db_conn()
+
+    if "db_leitura" not in g:
+        g.db_leitura = snapshot_leitura.obter()
+    return g.db_leitura
+
+
+def get_db_shard(usuario_id, leitura=False):
+    """
+    Conexão para o progresso de um usuário. Com um shard só é a mesma de
+    get_db_conn() (ou get_db_leitura(), se `leitura`); com mais, é uma conexão
+    do arquivo do usuário, com o banco principal anexado (ver shards.py).
+    """
+    if shards.total == 1:
+        return get_db_leitura() if leitura else get_db_conn()
+
+    pool_shard = shards.pool_do_usuario(usuario_id)
+    if not has_app_context():
+        return pool_shard.obter()
+
+    if "db_shards" not in g:
+        g.db_shards = {}
+    indice = shards.indice(usuario_id)
+    if indice not in g.db_shards:
+        g.db_shards[indice] = pool_shard.obter()
+    return g.db_shards[indice]
+
+
+def consultar_shards(funcao):
+    """
+    Chama `funcao(conn)` em cada shard (em paralelo) e devolve a lista de
+    resultados. Com um shard só usa a conexão de leitura da requisição.
+    """
+    if shards.total == 1:
+        return [funcao(get_db_leitura())]
+    return shards.em_todos(funcao)
+
+
+def liberar_db_conn(exc):
+    conn = g.pop("db_conn", None)
+    if conn is not None:
+        pool.devolver(conn)
+    conn = g.pop("db_leitura", None)
+    if conn is not None:
+        snapshot_leitura.devolver(conn)
+    for indice, conn in g.pop("db_shards", {}).items():
+        shards.pools[indice].devolver(conn)
 
-    # Usuário de teste
-    if cursor.execute("SELECT COUNT(*) FROM usuarios").fetchone()[0] == 0:
-        cursor.execute(
-            'INSERT INTO usuarios (nome, idade) VALUES (?, ?)',
-            ('Aluno Teste', 8)
+
+def init_db():
+    """
+    Aplica as migrações pendentes (ver migracoes.py). Com o schema em dia não
+    escreve nada no banco, então reiniciar a API não apaga usuários nem progresso.
+    """
+    conn = pool.obter()
+    try:
+        aplicadas = aplicar_migracoes(conn)
+        total_gravado = ler_total_gravado(conn)
+    finally:
+        pool.devolver(conn)
+
+    if aplicadas:
+        catalogo.invalidar()
+
+    # Subir com outro número de shards deixaria progresso no arquivo errado
+    if total_gravado != SHARDS:
+        raise RuntimeError(
+            f"O progresso está em {total_gravado} shard(s), mas CODEBRINCANDO_SHARDS={SHARDS}. "
+            f"Rode `flask --app app rebalancear-shards --para {SHARDS}` com a API parada."
         )
+    shards.preparar()
+
+
+def como_inteiro(valor):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def buscar_desafio(desafio_id):
+    return catalogo.obter().desafios.get(como_inteiro(desafio_id))
 
-    conn.commit()
-    conn.close()
+
+def corrigir_submissao(desafio, codigo_submetido):
+    gabarito = catalogo.obter().gabaritos.get(desafio['id'])
+    if gabarito is None:
+        gabarito = normalizar(desafio['linguagem'], desafio['codigo_esperado'])
+    return verificar(desafio['linguagem'], codigo_submetido, gabarito)
+
+
+def mensagem_resultado(correto):
+    return "Parabéns! Resposta correta!" if correto else "Código incorreto. Tente novamente!"
+
+
+def resposta_com_etag(etag, gerar_corpo):
+    """
+    Resposta JSON com ETag forte. Se o cliente já tem essa versão
+    (If-None-Match), devolve 304 sem nem montar o corpo. A comparação é fraca
+    porque a resposta comprimida volta com a mesma ETag marcada como W/.
+    """
+    if request.if_none_match.contains_weak(etag):
+        resposta = Response(status=304)
+    else:
+        resposta = Response(gerar_corpo(), mimetype="application/json")
+    resposta.set_etag(etag)
+    resposta.headers["Cache-Control"] = "no-cache"
+    return resposta
 
 
 # --- ROTA PARA CADASTRAR UM NOVO USUÁRIO ---
-@app.route('/cadastrar_usuario', methods=['POST'])
+@api.route('/cadastrar_usuario', methods=['POST'])
 def cadastrar_usuario():
     """
     Cadastrar novo usuário
@@ -208,7 +321,6 @@ def cadastrar_usuario():
     cursor.execute('INSERT INTO usuarios (nome, idade) VALUES (?, ?)', (nome, idade))
     novo_usuario_id = cursor.lastrowid
     conn.commit()
-    conn.close()
 
     return jsonify({
         "mensagem": f"Usuário '{nome}' cadastrado com sucesso!",
@@ -217,7 +329,7 @@ def cadastrar_usuario():
 
 
 # --- ROTA PARA ATUALIZAR DADOS DE UM USUÁRIO (PUT) ---
-@app.route('/usuarios/<int:usuario_id>', methods=['PUT'])
+@api.route('/usuarios/<int:usuario_id>', methods=['PUT'])
 def atualizar_usuario(usuario_id):
     """
     Atualizar usuário
@@ -281,7 +393,6 @@ def atualizar_usuario(usuario_id):
     ).fetchone()
 
     if not usuario:
-        conn.close()
         return jsonify({"erro": "Usuário não encontrado."}), 404
 
     nome_final = novo_nome if novo_nome is not None else usuario["nome"]
@@ -293,7 +404,6 @@ def atualizar_usuario(usuario_id):
     )
 
     conn.commit()
-    conn.close()
 
     return jsonify({
         "mensagem": "Usuário atualizado com sucesso.",
@@ -304,7 +414,7 @@ def atualizar_usuario(usuario_id):
 
 
 # --- ROTA PARA DELETAR UM USUÁRIO (DELETE) ---
-@app.route('/usuarios/<int:usuario_id>', methods=['DELETE'])
+@api.route('/usuarios/<int:usuario_id>', methods=['DELETE'])
 def deletar_usuario(usuario_id):
     """
     Deletar usuário
@@ -330,37 +440,358 @@ def deletar_usuario(usuario_id):
         description: Usuário não encontrado
     """
     conn = get_db_conn()
-    cursor = conn.cursor()
 
-    usuario = cursor.execute(
-        "SELECT * FROM usuarios WHERE id = ?",
+    # O progresso vai junto (ON DELETE CASCADE)
+    removidos = conn.execute(
+        "DELETE FROM usuarios WHERE id = ?",
         (usuario_id,)
-    ).fetchone()
+    ).rowcount
+    conn.commit()
 
-    if not usuario:
-        conn.close()
+    if not removidos:
         return jsonify({"erro": "Usuário não encontrado."}), 404
+    apagar_progresso_nos_shards([usuario_id])
 
-    cursor.execute(
-        "DELETE FROM progresso_usuarios WHERE usuario_id = ?",
-        (usuario_id,)
-    )
+    return jsonify({
+        "mensagem": f"Usuário {usuario_id} removido com sucesso."
+    }), 200
+
+
+# --- ROTA PARA DELETAR VÁRIOS USUÁRIOS (DELETE) ---
+# Filtros aceitos em "filtro"; cada um vira uma condição do WHERE
+FILTROS_REMOCAO = {
+    "idade": "idade = ?",
+    "idade_min": "idade >= ?",
+    "idade_max": "idade <= ?",
+}
 
-    cursor.execute(
-        "DELETE FROM usuarios WHERE id = ?",
-        (usuario_id,)
-    )
 
+@api.route('/usuarios', methods=['DELETE'])
+def deletar_usuarios():
+    """
+    Deletar vários usuários
+    ---
+    tags:
+      - Usuários
+    consumes:
+      - application/json
+    parameters:
+      - in: body
+        name: body
+        required: true
+        description: >
+          Lista de ids ou filtro por idade (não ambos). O progresso dos
+          usuários removidos vai junto, tudo em uma única transação.
+        schema:
+          type: object
+          properties:
+            ids:
+              type: array
+              items:
+                type: integer
+              example: [3, 4, 5]
+            filtro:
+              type: object
+              properties:
+                idade:
+                  type: integer
+                idade_min:
+                  type: integer
+                idade_max:
+                  type: integer
+              example: {"idade_min": 12}
+    responses:
+      200:
+        description: Usuários removidos
+        schema:
+          type: object
+          properties:
+            removidos:
+              type: integer
+              example: 3
+      400:
+        description: Nem ids nem filtro, ou valores inválidos
+    """
+    dados = request.get_json(silent=True) or {}
+    ids = dados.get("ids")
+    filtro = dados.get("filtro")
+
+    if (ids is None) == (filtro is None):
+        return jsonify({"erro": "Envie 'ids' ou 'filtro'."}), 400
+
+    if ids is not None:
+        if not isinstance(ids, list) or not ids:
+            return jsonify({"erro": "'ids' deve ser uma lista não vazia."}), 400
+        ids_inteiros = [como_inteiro(usuario_id) for usuario_id in ids]
+        if None in ids_inteiros:
+            return jsonify({"erro": "'ids' deve conter apenas números."}), 400
+        # json_each evita o limite de parâmetros do SQLite em listas grandes
+        sql = "DELETE FROM usuarios WHERE id IN (SELECT value FROM json_each(?)) RETURNING id"
+        parametros = (json.dumps(ids_inteiros),)
+    else:
+        if not isinstance(filtro, dict) or not filtro:
+            return jsonify({"erro": "'filtro' deve ser um objeto não vazio."}), 400
+        desconhecidos = set(filtro) - set(FILTROS_REMOCAO)
+        if desconhecidos:
+            return jsonify({"erro": f"Filtros desconhecidos: {', '.join(sorted(desconhecidos))}"}), 400
+        condicoes = []
+        parametros = []
+        for campo, valor in sorted(filtro.items()):
+            valor = como_inteiro(valor)
+            if valor is None:
+                return jsonify({"erro": f"Valor inválido para '{campo}'."}), 400
+            condicoes.append(FILTROS_REMOCAO[campo])
+            parametros.append(valor)
+        sql = "DELETE FROM usuarios WHERE " + " AND ".join(condicoes) + " RETURNING id"
+
+    conn = get_db_conn()
+    # Um único DELETE; o progresso sai em cascata na mesma transação
+    # (com shards, logo depois do commit)
+    removidos = [linha[0] for linha in conn.execute(sql, parametros).fetchall()]
     conn.commit()
-    conn.close()
+    apagar_progresso_nos_shards(removidos)
+
+    return jsonify({"removidos": len(removidos)}), 200
+
+
+def apagar_progresso_nos_shards(usuario_ids):
+    """
+    Com o progresso em outros arquivos o ON DELETE CASCADE não chega até
+    ele: depois do commit no banco principal, cada shard apaga o seu.
+    Se isso falhar, o `rebalancear-shards` limpa as sobras depois.
+    """
+    if shards.total == 1 or not usuario_ids:
+        return
+
+    por_shard = {}
+    for usuario_id in usuario_ids:
+        por_shard.setdefault(shards.indice(usuario_id), []).append(usuario_id)
+
+    for ids_shard in por_shard.values():
+        conn = get_db_shard(ids_shard[0])
+        parametros = (json.dumps(ids_shard),)
+        with conn:
+            conn.execute(
+                "DELETE FROM progresso_usuarios "
+                "WHERE usuario_id IN (SELECT value FROM json_each(?))",
+                parametros
+            )
+            conn.execute(
+                "DELETE FROM estatisticas_usuarios "
+                "WHERE usuario_id IN (SELECT value FROM json_each(?))",
+                parametros
+            )
+
+
+# --- IMPORTAÇÃO E EXPORTAÇÃO EM LOTE ---
+TAMANHO_LOTE_IMPORTACAO = int(os.getenv("CODEBRINCANDO_LOTE_IMPORTACAO", "500"))
+TAMANHO_LOTE_EXPORTACAO = 500
+MAX_ERROS_IMPORTACAO = 100
+
+
+def ler_linhas_importacao():
+    """
+    Lê o corpo da requisição aos poucos (sem carregar tudo na memória) e
+    devolve (numero_da_linha, dados) para cada usuário. NDJSON por padrão,
+    CSV (com cabeçalho nome,idade) quando o Content-Type for text/csv.
+    """
+    texto = io.TextIOWrapper(request.stream, encoding="utf-8", newline="")
+
+    if request.mimetype == "text/csv":
+        for numero, dados in enumerate(csv.DictReader(texto), start=2):
+            yield numero, dados
+        return
+
+    for numero, linha in enumerate(texto, start=1):
+        linha = linha.strip()
+        if not linha:
+            continue
+        try:
+            yield numero, json.loads(linha)
+        except ValueError:
+            yield numero, None
+
+
+def validar_usuario_importado(dados):
+    if not isinstance(dados, dict):
+        return None, "Linha inválida"
+
+    nome = dados.get("nome")
+    if not isinstance(nome, str) or not nome.strip():
+        return None, "Nome obrigatório"
+    nome = nome.strip()
+
+    idade = dados.get("idade")
+    if idade in (None, ""):
+        idade = None
+    else:
+        idade = como_inteiro(idade)
+        if idade is None:
+            return None, "Idade inválida"
+
+    return (nome, idade), None
+
+
+@api.route('/usuarios/importar', methods=['POST'])
+def importar_usuarios():
+    """
+    Importar usuários em lote (NDJSON ou CSV)
+    ---
+    tags:
+      - Usuários
+    consumes:
+      - application/x-ndjson
+      - text/csv
+    parameters:
+      - in: body
+        name: body
+        required: true
+        description: >
+          Um usuário por linha. NDJSON: {"nome": "Maria", "idade": 10}.
+          CSV (Content-Type text/csv): cabeçalho nome,idade.
+        schema:
+          type: string
+          example: '{"nome": "Maria", "idade": 10}'
+    responses:
+      200:
+        description: Ids atribuídos, na ordem das linhas válidas
+        schema:
+          type: object
+          properties:
+            importados:
+              type: integer
+            ids:
+              type: array
+              items:
+                type: integer
+            erros:
+              type: array
+              description: Até 100 linhas rejeitadas
+              items:
+                type: object
+                properties:
+                  linha:
+                    type: integer
+                  erro:
+                    type: string
+      500:
+        description: Erro interno durante a importação
+    """
+    conn = get_db_conn()
+    ids = []
+    erros = []
+    total_erros = 0
+    bloco = []
+
+    def gravar_bloco():
+        # O bloco já está todo na memória: a transação não fica aberta
+        # enquanto o corpo ainda chega pela rede
+        with conn:
+            conn.executemany('INSERT INTO usuarios (nome, idade) VALUES (?, ?)', bloco)
+            ultimo_id = conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+        # Com o lock de escrita na mão durante o bloco, os ids (AUTOINCREMENT) são seguidos
+        ids.extend(range(ultimo_id - len(bloco) + 1, ultimo_id + 1))
+        bloco.clear()
+
+    try:
+        for numero, dados in ler_linhas_importacao():
+            usuario, erro = validar_usuario_importado(dados)
+            if erro:
+                total_erros += 1
+                if len(erros) < MAX_ERROS_IMPORTACAO:
+                    erros.append({"linha": numero, "erro": erro})
+                continue
+
+            bloco.append(usuario)
+            if len(bloco) >= TAMANHO_LOTE_IMPORTACAO:
+                gravar_bloco()
+
+        if bloco:
+            gravar_bloco()
+
+    except Exception as e:
+        print(f"Ocorreu un erro na rota /usuarios/importar: {e}")
+        # Blocos anteriores já foram gravados; informamos até onde foi
+        return jsonify({"erro": str(e), "importados": len(ids), "ids": ids}), 500
 
     return jsonify({
-        "mensagem": f"Usuário {usuario_id} removido com sucesso."
-    }), 200
+        "importados": len(ids),
+        "ids": ids,
+        "total_erros": total_erros,
+        "erros": erros
+    })
+
+
+@api.route('/exportar', methods=['GET'])
+def exportar():
+    """
+    Exportar usuários e progresso (NDJSON em streaming)
+    ---
+    tags:
+      - Usuários
+    produces:
+      - application/x-ndjson
+    responses:
+      200:
+        description: >
+          Uma linha JSON por registro: primeiro os usuários
+          ({"tipo": "usuario", "id", "nome", "idade"}), depois o progresso
+          ({"tipo": "progresso", "usuario_id", "desafio_id", "status", "data_conclusao"}).
+    """
+    def em_lotes(tipo, colunas, linhas):
+        linhas = iter(linhas)
+        while True:
+            lote = list(islice(linhas, TAMANHO_LOTE_EXPORTACAO))
+            if not lote:
+                return
+            yield b"".join(
+                serializar({**dict(zip(colunas, linha)), "tipo": tipo}) + b"\n" for linha in lote
+            )
+
+    def gerar_linhas():
+        # Com shards, o progresso vem de cada arquivo (o principal só tem os usuários)
+        pools = [pool] + (shards.pools if shards.total > 1 else [])
+        conexoes = [pool_arquivo.obter() for pool_arquivo in pools]
+        try:
+            # Uma transação de leitura por arquivo: cada um exporta uma foto só
+            for conn in conexoes:
+                conn.execute("BEGIN")
+
+            cursor = cursor_de_tuplas(conexoes[0])
+            cursor.execute("SELECT id, nome, idade FROM usuarios ORDER BY id")
+            yield from em_lotes("usuario", [c[0] for c in cursor.description], cursor)
+
+            cursores = []
+            for conn in conexoes[-shards.total:]:
+                cursor = cursor_de_tuplas(conn)
+                cursor.execute(
+                    "SELECT usuario_id, desafio_id, status, data_conclusao "
+                    "FROM progresso_usuarios ORDER BY usuario_id, desafio_id"
+                )
+                cursores.append(cursor)
+            # Cada shard já vem ordenado; o merge mantém a ordem geral
+            colunas = [c[0] for c in cursores[0].description]
+            yield from em_lotes("progresso", colunas, heapq.merge(*cursores))
+        finally:
+            for pool_arquivo, conn in zip(pools, conexoes):
+                pool_arquivo.devolver(conn)
+
+    return Response(
+        gerar_linhas(),
+        mimetype="application/x-ndjson",
+        headers={"Content-Disposition": "attachment; filename=codebrincando.ndjson"}
+    )
 
 
 # --- ROTAS DE PROGRESSO/DESAFIOS ---
-@app.route('/progresso/<int:usuario_id>', methods=['GET'])
+CAMPOS_PROGRESSO = (
+    'id', 'nome', 'linguagem', 'instrucao', 'status', 'codigo_bugado', 'codigo_esperado'
+)
+STATUS_PROGRESSO = ('pendente', 'concluido')
+LIMITE_MAX_PAGINA = 1000
+
+
+@api.route('/progresso/<int:usuario_id>', methods=['GET'])
 def buscar_progresso(usuario_id):
     """
     Listar desafios e status de um usuário
@@ -373,9 +804,49 @@ def buscar_progresso(usuario_id):
         type: integer
         required: true
         description: ID do usuário
+      - in: query
+        name: fields
+        type: string
+        required: false
+        description: Campos separados por vírgula (o id sempre vem junto)
+        example: id,status
+      - in: query
+        name: linguagem
+        type: string
+        required: false
+        description: Só desafios desta linguagem
+        example: html
+      - in: query
+        name: status
+        type: string
+        enum: [pendente, concluido]
+        required: false
+        description: Só desafios com este status para o usuário
+      - in: query
+        name: after_id
+        type: integer
+        required: false
+        description: Cursor da paginação, devolve desafios com id maior que este
+      - in: query
+        name: limit
+        type: integer
+        required: false
+        description: Quantidade máxima de desafios na página (até 1000)
+      - in: header
+        name: If-None-Match
+        type: string
+        required: false
+        description: ETag recebido na última resposta
     responses:
       200:
         description: Lista de desafios com status para o usuário
+        headers:
+          ETag:
+            type: string
+            description: Versão do catálogo + status do usuário
+          X-Proximo-After-Id:
+            type: integer
+            description: Valor de after_id para a próxima página (só quando há mais)
         schema:
           type: array
           items:
@@ -396,27 +867,144 @@ def buscar_progresso(usuario_id):
                 type: string
               codigo_esperado:
                 type: string
+      304:
+        description: Nada mudou desde o ETag enviado em If-None-Match
+      400:
+        description: Parâmetro de consulta inválido
     """
-    conn = get_db_conn()
-    query = """
-        SELECT
-            d.id,
-            d.nome,
-            d.linguagem,
-            d.instrucao,
-            COALESCE(p.status, 'pendente') as status,
-            d.codigo_bugado,
-            d.codigo_esperado
-        FROM desafios d
-        LEFT JOIN progresso_usuarios p
-            ON d.id = p.desafio_id AND p.usuario_id = ?
-    """
-    progresso = conn.execute(query, (usuario_id,)).fetchall()
-    conn.close()
-    return jsonify([dict(row) for row in progresso])
-
-
-@app.route('/progresso', methods=['POST'])
+    cat = catalogo.obter()
+
+    campos = None
+    if request.args.get('fields'):
+        campos = [c.strip() for c in request.args['fields'].split(',') if c.strip()]
+        invalidos = set(campos) - set(CAMPOS_PROGRESSO)
+        if invalidos:
+            return jsonify({"erro": f"Campos inválidos: {', '.join(sorted(invalidos))}"}), 400
+        if 'id' not in campos:
+            campos.insert(0, 'id')
+
+    linguagem = request.args.get('linguagem')
+    status_filtro = request.args.get('status')
+    if status_filtro is not None and status_filtro not in STATUS_PROGRESSO:
+        return jsonify({"erro": "Status inválido. Use pendente ou concluido."}), 400
+
+    # Sem type=int: o Flask trocaria um valor que não é número pelo padrão
+    after_id = como_inteiro(request.args.get('after_id', 0))
+    if after_id is None:
+        return jsonify({"erro": "after_id precisa ser um número"}), 400
+    limite = request.args.get('limit')
+    if limite is not None:
+        limite = como_inteiro(limite)
+        if limite is None or limite < 1:
+            return jsonify({"erro": "limit precisa ser maior que zero"}), 400
+        limite = min(limite, LIMITE_MAX_PAGINA)
+
+    # Os desafios vêm do catálogo em memória (já ordenados por id); do banco
+    # só lemos os status do usuário a partir do cursor after_id
+    desafios, ids = cat.desafios_da_linguagem(linguagem)
+    inicio = bisect_right(ids, after_id)
+    # Direto do arquivo, e não da cópia de leitura: quem acabou de enviar uma
+    # resposta precisa ver o novo status na hora (leia-suas-escritas)
+    conn = get_db_shard(usuario_id)
+    tem_mais = False
+
+    # Submissões aceitas pela escrita adiada que ainda não chegaram ao banco
+    pendentes = {
+        desafio_id: status
+        for desafio_id, status in escrita_adiada.pendentes_do_usuario(usuario_id).items()
+        if desafio_id > after_id
+    }
+
+    if status_filtro is None:
+        fim = inicio + limite if limite is not None else len(desafios)
+        pagina = desafios[inicio:fim]
+        tem_mais = fim < len(desafios)
+        status_por_desafio = {}
+        if pagina:
+            status_por_desafio = dict(conn.execute(
+                'SELECT desafio_id, status FROM progresso_usuarios '
+                'WHERE usuario_id = ? AND desafio_id BETWEEN ? AND ?',
+                (usuario_id, pagina[0]['id'], pagina[-1]['id'])
+            ).fetchall())
+            if pendentes:
+                for desafio in pagina:
+                    if desafio['id'] in pendentes:
+                        status_por_desafio[desafio['id']] = pendentes[desafio['id']]
+
+    elif status_filtro == 'pendente':
+        # Pendente também é quem nunca foi tentado, então pulamos os que já saíram dele
+        status_por_desafio = dict(conn.execute(
+            'SELECT desafio_id, status FROM progresso_usuarios '
+            'WHERE usuario_id = ? AND desafio_id > ? AND status != ?',
+            (usuario_id, after_id, 'pendente')
+        ).fetchall())
+        for desafio_id, status in pendentes.items():
+            if status == 'pendente':
+                status_por_desafio.pop(desafio_id, None)
+            else:
+                status_por_desafio[desafio_id] = status
+        pagina = []
+        for desafio in islice(desafios, inicio, None):
+            if desafio['id'] in status_por_desafio:
+                continue
+            if limite is not None and len(pagina) == limite:
+                tem_mais = True
+                break
+            pagina.append(desafio)
+
+    else:
+        linhas = conn.execute(
+            'SELECT desafio_id, status FROM progresso_usuarios '
+            'WHERE usuario_id = ? AND status = ? AND desafio_id > ? ORDER BY desafio_id',
+            (usuario_id, status_filtro, after_id)
+        )
+        if pendentes:
+            mescladas = dict(linhas.fetchall())
+            for desafio_id, status in pendentes.items():
+                if status == status_filtro:
+                    mescladas[desafio_id] = status
+                else:
+                    mescladas.pop(desafio_id, None)
+            linhas = sorted(mescladas.items())
+        pagina = []
+        status_por_desafio = {}
+        for desafio_id, status in linhas:
+            desafio = cat.desafios.get(desafio_id)
+            if desafio is None or (linguagem is not None and desafio['linguagem'] != linguagem):
+                continue
+            if limite is not None and len(pagina) == limite:
+                tem_mais = True
+                break
+            pagina.append(desafio)
+            status_por_desafio[desafio_id] = status
+
+    etag = gerar_etag(
+        cat.etag_desafios.encode(),
+        request.query_string,
+        serializar(sorted(status_por_desafio.items())),
+        b"+" if tem_mais else b"."
+    )
+
+    def gerar_corpo():
+        itens = []
+        for desafio in pagina:
+            status = status_por_desafio.get(desafio['id'], 'pendente')
+            if campos is None:
+                itens.append({**desafio, "status": status})
+            else:
+                itens.append({
+                    campo: status if campo == 'status' else desafio[campo]
+                    for campo in campos
+                })
+        return serializar(itens)
+
+    resposta = resposta_com_etag(etag, gerar_corpo)
+    if tem_mais:
+        resposta.headers['X-Proximo-After-Id'] = str(pagina[-1]['id'])
+    return resposta
+
+
+@api.route('/progresso', methods=['POST'])
 def submeter_progresso():
     """
     Submeter código de um desafio
@@ -476,53 +1064,53 @@ def submeter_progresso():
         if not all([usuario_id, desafio_id, codigo_submetido is not None]):
             return jsonify({"erro": "Dados incompletos"}), 400
 
-        conn = get_db_conn()
-        cursor = conn.cursor()
-
-        usuario = cursor.execute(
-            'SELECT * FROM usuarios WHERE id = ?',
-            (usuario_id,)
-        ).fetchone()
-        if not usuario:
-            conn.close()
+        usuario_id = como_inteiro(usuario_id)
+        if usuario_id is None:
             return jsonify({"erro": "Usuário não encontrado"}), 404
 
-        desafio = cursor.execute(
-            'SELECT * FROM desafios WHERE id = ?',
-            (desafio_id,)
-        ).fetchone()
+        conn = get_db_shard(usuario_id)
+        cursor = conn.cursor()
+
+        desafio = buscar_desafio(desafio_id)
         if not desafio:
-            conn.close()
             return jsonify({"erro": "Desafio não encontrado"}), 404
 
-        codigo_esperado = desafio['codigo_esperado']
-        correto = codigo_submetido.strip() == codigo_esperado.strip()
+        correto = corrigir_submissao(desafio, codigo_submetido)
         status = "concluido" if correto else "pendente"
-
-        progresso_existente = cursor.execute(
-            'SELECT id FROM progresso_usuarios WHERE usuario_id = ? AND desafio_id = ?',
-            (usuario_id, desafio_id)
-        ).fetchone()
-
         agora = datetime.now() if correto else None
 
-        if progresso_existente:
-            cursor.execute(
-                'UPDATE progresso_usuarios SET status = ?, data_conclusao = ? WHERE id = ?',
-                (status, agora, progresso_existente['id'])
-            )
-        else:
-            cursor.execute(
-                'INSERT INTO progresso_usuarios (usuario_id, desafio_id, status, data_conclusao) VALUES (?, ?, ?, ?)',
-                (usuario_id, desafio_id, status, agora)
-            )
-
-        conn.commit()
-        conn.close()
+        # Escrita adiada: aqui só lemos (o usuário existe?) e a gravação vai
+        # para a fila, que faz um commit por lote. Fila cheia grava direto.
+        enfileirado = False
+        if ESCRITA_ADIADA:
+            if not cursor.execute('SELECT 1 FROM usuarios WHERE id = ?', (usuario_id,)).fetchone():
+                return jsonify({"erro": "Usuário não encontrado"}), 404
+            enfileirado = escrita_adiada.enfileirar(usuario_id, desafio['id'], status, agora)
+
+        if not enfileirado:
+            # Gravação fora da fila: um item antigo do par que ainda esteja nela não vale mais
+            with escrita_adiada.gravando_direto([(usuario_id, desafio['id'])]):
+                # Um único comando: só insere se o usuário existir e, se já houver
+                # progresso para o par (usuario_id, desafio_id), atualiza a linha.
+                cursor.execute(
+                    """
+                    INSERT INTO progresso_usuarios (usuario_id, desafio_id, status, data_conclusao)
+                    SELECT ?, ?, ?, ? FROM usuarios WHERE id = ?
+                    ON CONFLICT (usuario_id, desafio_id) DO UPDATE SET
+                        status = excluded.status,
+                        data_conclusao = excluded.data_conclusao
+                    """,
+                    (usuario_id, desafio['id'], status, agora, usuario_id)
+                )
+                if cursor.rowcount == 0:
+                    conn.rollback()
+                    return jsonify({"erro": "Usuário não encontrado"}), 404
+
+                conn.commit()
 
         return jsonify({
             "status": status,
-            "mensagem": "Parabéns! Resposta correta!" if correto else "Código incorreto. Tente novamente!",
+            "mensagem": mensagem_resultado(correto),
             "correto": correto
         })
 
@@ -531,17 +1119,352 @@ def submeter_progresso():
         return jsonify({"erro": str(e)}), 500
 
 
+MAX_ITENS_LOTE = int(os.getenv("CODEBRINCANDO_MAX_ITENS_LOTE", "500"))
+
+
+@api.route('/progresso/lote', methods=['POST'])
+def submeter_progresso_lote():
+    """
+    Submeter várias respostas de uma vez (modo offline)
+    ---
+    tags:
+      - Progresso
+    consumes:
+      - application/json
+    parameters:
+      - in: body
+        name: body
+        required: true
+        description: Lista de submissões, na ordem em que foram feitas
+        schema:
+          type: array
+          items:
+            type: object
+            required:
+              - usuario_id
+              - desafio_id
+              - codigo_submetido
+            properties:
+              usuario_id:
+                type: integer
+                example: 1
+              desafio_id:
+                type: integer
+                example: 2
+              codigo_submetido:
+                type: string
+                example: "<h1>Olá, Mundo!</h1>"
+    responses:
+      200:
+        description: Resultado de cada item, na mesma ordem do envio
+        schema:
+          type: object
+          properties:
+            total:
+              type: integer
+            gravados:
+              type: integer
+            resultados:
+              type: array
+              items:
+                type: object
+                properties:
+                  indice:
+                    type: integer
+                  status:
+                    type: string
+                    example: concluido
+                  mensagem:
+                    type: string
+                  correto:
+                    type: boolean
+                  erro:
+                    type: string
+                    description: Presente só quando o item foi rejeitado
+      400:
+        description: Corpo não é uma lista ou passou do limite de itens
+      500:
+        description: Erro interno ao gravar o lote
+    """
+    try:
+        itens = request.get_json(silent=True)
+        if not isinstance(itens, list) or not itens:
+            return jsonify({"erro": "Envie uma lista de submissões"}), 400
+        if len(itens) > MAX_ITENS_LOTE:
+            return jsonify({"erro": f"Máximo de {MAX_ITENS_LOTE} submissões por lote"}), 400
+
+        conn = get_db_conn()
+
+        # Validação em bloco: uma consulta para todos os usuários do lote
+        ids_usuarios = {
+            como_inteiro(item.get('usuario_id')) for item in itens
+            if isinstance(item, dict)
+        }
+        ids_usuarios.discard(None)
+        usuarios_existentes = set()
+        if ids_usuarios:
+            marcadores = ",".join("?" * len(ids_usuarios))
+            usuarios_existentes = {
+                row[0] for row in conn.execute(
+                    f'SELECT id FROM usuarios WHERE id IN ({marcadores})',
+                    tuple(ids_usuarios)
+                )
+            }
+
+        resultados = []
+        linhas = []
+        agora = datetime.now()
+
+        for indice, item in enumerate(itens):
+            if not isinstance(item, dict):
+                resultados.append({"indice": indice, "erro": "Dados incompletos"})
+                continue
+
+            usuario_id = item.get('usuario_id')
+            desafio_id = item.get('desafio_id')
+            codigo_submetido = item.get('codigo_submetido')
+
+            if not all([usuario_id, desafio_id, codigo_submetido is not None]):
+                resultados.append({"indice": indice, "erro": "Dados incompletos"})
+                continue
+
+            usuario_id = como_inteiro(usuario_id)
+            if usuario_id not in usuarios_existentes:
+                resultados.append({"indice": indice, "erro": "Usuário não encontrado"})
+                continue
+
+            desafio = buscar_desafio(desafio_id)
+            if not desafio:
+                resultados.append({"indice": indice, "erro": "Desafio não encontrado"})
+                continue
+
+            correto = corrigir_submissao(desafio, codigo_submetido)
+            status = "concluido" if correto else "pendente"
+            linhas.append((usuario_id, desafio['id'], status, agora if correto else None))
+            resultados.append({
+                "indice": indice,
+                "status": status,
+                "mensagem": mensagem_resultado(correto),
+                "correto": correto
+            })
+
+        # Uma transação por shard (com um só, uma para o lote inteiro): um
+        # commit e um fsync por arquivo. Itens repetidos para o mesmo desafio
+        # caem no mesmo shard e são aplicados na ordem do envio.
+        por_shard = {}
+        for linha in linhas:
+            por_shard.setdefault(shards.indice(linha[0]), []).append(linha)
+        # Com escrita adiada, itens antigos desses pares ainda na fila são descartados
+        for linhas_shard in por_shard.values():
+            conn_shard = get_db_shard(linhas_shard[0][0])
+            pares = [(linha[0], linha[1]) for linha in linhas_shard]
+            with escrita_adiada.gravando_direto(pares), conn_shard:
+                conn_shard.executemany(
+                    """
+                    INSERT INTO progresso_usuarios (usuario_id, desafio_id, status, data_conclusao)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT (usuario_id, desafio_id) DO UPDATE SET
+                        status = excluded.status,
+                        data_conclusao = excluded.data_conclusao
+                    """,
+                    linhas_shard
+                )
+
+        return jsonify({
+            "total": len(itens),
+            "gravados": len(linhas),
+            "resultados": resultados
+        })
+
+    except Exception as e:
+        print(f"Ocorreu un erro na rota /progresso/lote: {e}")
+        return jsonify({"erro": str(e)}), 500
+
+
+# --- ROTAS DE ESTATÍSTICAS ---
+# Leem só as tabelas de agregados, mantidas pelos gatilhos da migração 5
+LIMITE_MAX_RANKING = 100
+
+
+@api.route('/estatisticas/desafios', methods=['GET'])
+def estatisticas_desafios():
+    """
+    Quantas crianças concluíram cada desafio
+    ---
+    tags:
+      - Estatísticas
+    responses:
+      200:
+        description: Um item por desafio, na ordem dos ids
+        schema:
+          type: array
+          items:
+            type: object
+            properties:
+              desafio_id:
+                type: integer
+              nome:
+                type: string
+              linguagem:
+                type: string
+              concluidos:
+                type: integer
+                example: 12
+    """
+    cat = catalogo.obter()
+    # Cada shard conta só os seus usuários: soma os parciais
+    concluidos = Counter()
+    for parcial in consultar_shards(lambda conn: conn.execute(
+        'SELECT desafio_id, concluidos FROM estatisticas_desafios'
+    ).fetchall()):
+        concluidos.update(dict(parcial))
+
+    return jsonify([
+        {
+            "desafio_id": desafio['id'],
+            "nome": desafio['nome'],
+            "linguagem": desafio['linguagem'],
+            "concluidos": concluidos.get(desafio['id'], 0)
+        }
+        for desafio in cat.desafios_ordenados
+    ])
+
+
+@api.route('/estatisticas/usuarios/<int:usuario_id>', methods=['GET'])
+def estatisticas_usuario(usuario_id):
+    """
+    Quantos desafios um usuário concluiu
+    ---
+    tags:
+      - Estatísticas
+    parameters:
+      - in: path
+        name: usuario_id
+        type: integer
+        required: true
+        description: ID do usuário
+    responses:
+      200:
+        description: Contagem de desafios concluídos
+        schema:
+          type: object
+          properties:
+            usuario_id:
+              type: integer
+            concluidos:
+              type: integer
+            total_desafios:
+              type: integer
+      404:
+        description: Usuário não encontrado
+    """
+    conn = get_db_shard(usuario_id, leitura=True)
+    linha = conn.execute(
+        """
+        SELECT u.id, COALESCE(e.concluidos, 0) AS concluidos
+        FROM usuarios u
+        LEFT JOIN estatisticas_usuarios e ON e.usuario_id = u.id
+        WHERE u.id = ?
+        """,
+        (usuario_id,)
+    ).fetchone()
+
+    if not linha:
+        return jsonify({"erro": "Usuário não encontrado."}), 404
+
+    return jsonify({
+        "usuario_id": usuario_id,
+        "concluidos": linha['concluidos'],
+        "total_desafios": len(catalogo.obter().desafios)
+    })
+
+
+@api.route('/ranking', methods=['GET'])
+def ranking():
+    """
+    Ranking dos usuários que mais concluíram desafios
+    ---
+    tags:
+      - Estatísticas
+    parameters:
+      - in: query
+        name: limit
+        type: integer
+        required: false
+        description: Quantidade de posições (padrão 10, máximo 100)
+    responses:
+      200:
+        description: Usuários em ordem decrescente de desafios concluídos
+        schema:
+          type: array
+          items:
+            type: object
+            properties:
+              posicao:
+                type: integer
+              usuario_id:
+                type: integer
+              nome:
+                type: string
+              concluidos:
+                type: integer
+      400:
+        description: limit não é um número maior que zero
+    """
+    limite = como_inteiro(request.args.get('limit', 10))
+    if limite is None or limite < 1:
+        return jsonify({"erro": "limit precisa ser maior que zero"}), 400
+    limite = min(limite, LIMITE_MAX_RANKING)
+
+    def ranking_do_shard(conn):
+        cursor = cursor_de_tuplas(conn)
+        return como_dicts(cursor, cursor.execute(
+            """
+            SELECT e.usuario_id, u.nome, e.concluidos
+            FROM estatisticas_usuarios e
+            JOIN usuarios u ON u.id = e.usuario_id
+            WHERE e.concluidos > 0
+            ORDER BY e.concluidos DESC, e.usuario_id
+            LIMIT ?
+            """,
+            (limite,)
+        ))
+
+    # Os `limite` primeiros de cada shard contêm os `limite` primeiros de todos
+    parciais = consultar_shards(ranking_do_shard)
+    linhas = parciais[0] if len(parciais) == 1 else heapq.nsmallest(
+        limite,
+        (linha for parcial in parciais for linha in parcial),
+        key=lambda linha: (-linha['concluidos'], linha['usuario_id'])
+    )
+
+    return jsonify([
+        {"posicao": posicao, **linha}
+        for posicao, linha in enumerate(linhas, start=1)
+    ])
+
+
 # --- ROTA PARA BUSCAR EXPLICAÇÕES ---
-@app.route('/explicacoes', methods=['GET'])
+@api.route('/explicacoes', methods=['GET'])
 def get_explicacoes():
     """
     Listar explicações iniciais
     ---
     tags:
       - Conteúdo
+    parameters:
+      - in: header
+        name: If-None-Match
+        type: string
+        required: false
+        description: ETag recebido na última resposta
     responses:
       200:
         description: Lista de explicações exibidas na tela de introdução
+        headers:
+          ETag:
+            type: string
+            description: Versão atual das explicações
         schema:
           type: array
           items:
@@ -559,17 +1482,298 @@ def get_explicacoes():
               codigo:
                 type: string
                 nullable: true
+      304:
+        description: Nada mudou desde o ETag enviado em If-None-Match
     """
+    cat = catalogo.obter()
+    return guardar_comprimida(resposta_com_etag(cat.etag_explicacoes, lambda: cat.corpo_explicacoes))
+
+
+# --- ROTA DE BUSCA TEXTUAL ---
+# Lê direto das tabelas FTS5 da migração 9 (busca_desafios e busca_explicacoes)
+LIMITE_PADRAO_BUSCA = 20
+LIMITE_MAX_BUSCA = 100
+TIPOS_BUSCA = ('desafio', 'explicacao')
+_PALAVRAS_BUSCA = re.compile(r"\w+")
+
+# Nome/título pesa 10x mais que o texto no bm25(): achar no título é mais relevante
+SQL_BUSCA = {
+    'desafio': """
+        SELECT 'desafio' AS tipo, rowid AS id,
+               highlight(busca_desafios, 0, '<mark>', '</mark>') AS titulo,
+               snippet(busca_desafios, 1, '<mark>', '</mark>', '…', 16) AS trecho,
+               bm25(busca_desafios, 10.0, 1.0) AS relevancia
+        FROM busca_desafios WHERE busca_desafios MATCH :consulta
+    """,
+    'explicacao': """
+        SELECT 'explicacao' AS tipo, rowid AS id,
+               highlight(busca_explicacoes, 0, '<mark>', '</mark>') AS titulo,
+               snippet(busca_explicacoes, 1, '<mark>', '</mark>', '…', 16) AS trecho,
+               bm25(busca_explicacoes, 10.0, 1.0) AS relevancia
+        FROM busca_explicacoes WHERE busca_explicacoes MATCH :consulta
+    """,
+}
+SQL_CONTAR_BUSCA = {
+    'desafio': "SELECT COUNT(*) FROM busca_desafios WHERE busca_desafios MATCH :consulta",
+    'explicacao': "SELECT COUNT(*) FROM busca_explicacoes WHERE busca_explicacoes MATCH :consulta",
+}
+
+
+def consulta_fts(texto):
+    """
+    Transforma o texto digitado em uma consulta FTS5 segura: cada palavra
+    vai entre aspas e todas precisam aparecer. Palavras com 3 letras ou mais
+    valem como prefixo ("parag" acha "parágrafo"). Aspas, parênteses e
+    operadores do usuário não viram sintaxe.
+    """
+    palavras = _PALAVRAS_BUSCA.findall(texto or "")
+    return " ".join(
+        f'"{palavra}"*' if len(palavra) >= 3 else f'"{palavra}"' for palavra in palavras
+    )
+
+
+@api.route('/busca', methods=['GET'])
+def busca_textual():
+    """
+    Buscar desafios e explicações por palavra-chave
+    ---
+    tags:
+      - Conteúdo
+    parameters:
+      - in: query
+        name: q
+        type: string
+        required: true
+        description: Palavras procuradas (todas precisam aparecer; vale começo de palavra, sem acento)
+        example: paragrafo
+      - in: query
+        name: tipo
+        type: string
+        enum: [desafio, explicacao]
+        required: false
+        description: Só desafios ou só explicações
+      - in: query
+        name: limit
+        type: integer
+        required: false
+        description: Resultados por página (padrão 20, máximo 100)
+      - in: query
+        name: offset
+        type: integer
+        required: false
+        description: Quantos resultados pular (paginação)
+    responses:
+      200:
+        description: >
+          Resultados do mais para o menos relevante. Os trechos encontrados
+          vêm marcados com <mark></mark>.
+        headers:
+          X-Total-Resultados:
+            type: integer
+            description: Total de resultados da busca (todas as páginas)
+          X-Proximo-Offset:
+            type: integer
+            description: Valor de offset para a próxima página (só quando há mais)
+        schema:
+          type: array
+          items:
+            type: object
+            properties:
+              tipo:
+                type: string
+                example: desafio
+              id:
+                type: integer
+              titulo:
+                type: string
+                example: "<mark>Parágrafo</mark> Tímido"
+              trecho:
+                type: string
+                example: "A tag de <mark>parágrafo</mark> é a p e também precisa ser aberta…"
+      400:
+        description: Busca vazia ou parâmetro inválido
+    """
+    consulta = consulta_fts(request.args.get('q'))
+    if not consulta:
+        return jsonify({"erro": "Informe o que buscar em q."}), 400
+
+    tipo = request.args.get('tipo')
+    if tipo is not None and tipo not in TIPOS_BUSCA:
+        return jsonify({"erro": "Tipo inválido. Use desafio ou explicacao."}), 400
+    tipos = (tipo,) if tipo else TIPOS_BUSCA
+
+    limite = como_inteiro(request.args.get('limit', LIMITE_PADRAO_BUSCA))
+    offset = como_inteiro(request.args.get('offset', 0))
+    if limite is None or offset is None or limite < 1 or offset < 0:
+        return jsonify({"erro": "limit precisa ser maior que zero e offset não pode ser negativo"}), 400
+    limite = min(limite, LIMITE_MAX_BUSCA)
+
+    # As tabelas FTS só mudam com o catálogo: não vão para a cópia de leitura
     conn = get_db_conn()
-    explicacoes = conn.execute(
-        'SELECT id, tipo, titulo, texto, codigo FROM explicacoes ORDER BY id'
-    ).fetchall()
-    conn.close()
-    return jsonify([dict(row) for row in explicacoes])
+    parametros = {"consulta": consulta, "limite": limite, "offset": offset}
+    total = sum(conn.execute(SQL_CONTAR_BUSCA[t], parametros).fetchone()[0] for t in tipos)
+
+    cursor = cursor_de_tuplas(conn)
+    linhas = como_dicts(cursor, cursor.execute(
+        " UNION ALL ".join(SQL_BUSCA[t] for t in tipos)
+        + " ORDER BY relevancia, tipo, id LIMIT :limite OFFSET :offset",
+        parametros
+    ))
+    for linha in linhas:
+        del linha['relevancia']
+
+    resposta = jsonify(linhas)
+    resposta.headers['X-Total-Resultados'] = str(total)
+    if offset + len(linhas) < total:
+        resposta.headers['X-Proximo-Offset'] = str(offset + len(linhas))
+    return resposta
 
 
 # --- ROTA DO ROBOTECA (GROQ) ---
-@app.route("/ajuda-bot", methods=["POST"])
+GROQ_MODELO = "llama-3.1-8b-instant"
+GROQ_TEMPERATURA = 0.4
+MENSAGEM_ERRO_ROBOTECA = "Não foi possível falar com o robô agora, tente novamente mais tarde."
+MENSAGEM_SOBRECARGA_ROBOTECA = (
+    "A RoboTeca está ajudando muitas crianças ao mesmo tempo. "
+    "Espere um pouquinho e pergunte de novo!"
+)
+
+
+def resposta_sobrecarga():
+    resposta = jsonify({"erro": MENSAGEM_SOBRECARGA_ROBOTECA})
+    resposta.status_code = 503
+    resposta.headers["Retry-After"] = "2"
+    return resposta
+
+
+def montar_mensagem_roboteca(contexto, duvida):
+    return (
+        "Você é um robô tutor que ensina programação para crianças de 9 a 12 anos. "
+        "Use uma linguagem neutra quanto ao gênero, chame-os de crianças ou estudantes. "
+        "Use pronomes neutros com (a) ou (as)"
+        "Explique SEM termos técnicos complicados, usando exemplos simples, analogias "
+        "e linguagem divertida. Não use palavrões nem conteúdo sensível.\n\n"
+        f"Contexto da explicação ou desafio: {contexto}\n\n"
+        f"Dúvida da criança: {duvida}\n\n"
+        "Resposta:"
+    )
+
+
+def registrar_erro_groq(e):
+    if isinstance(e, ErroGroq) and e.status_code is not None:
+        print("Groq status code:", e.status_code)
+        print("Groq response body:", e.corpo)
+    print("Erro com a API da Groq:", e)
+
+
+def buscar_no_indice(contexto, duvida):
+    """
+    Resposta do índice local (explicações, desafios e respostas antigas da
+    Groq no mesmo contexto) se a dúvida bater acima do limiar; senão None e
+    a Groq é chamada.
+    """
+    if not ROBOTECA_INDICE:
+        return None
+    return indice_roboteca.buscar(duvida, contexto)
+
+
+def cabecalhos_do_indice(encontrado):
+    _, confianca, (tipo, referencia) = encontrado
+    fonte = tipo if tipo == "resposta" else f"{tipo}/{referencia}"
+    return {"X-Cache": "INDICE", "X-Indice-Confianca": str(confianca), "X-Indice-Fonte": fonte}
+
+
+def guardar_resposta_groq(chave_cache, contexto, duvida, texto):
+    """
+    Guarda a resposta no cache e no índice. Um erro do banco aqui não pode
+    transformar uma resposta que a Groq já deu em erro para a criança.
+    """
+    try:
+        cache_roboteca.guardar(chave_cache, texto, duvida, contexto)
+    except sqlite3.Error as e:
+        print(f"Erro ao guardar resposta da RoboTeca no cache: {e}")
+    indice_roboteca.adicionar_resposta(chave_cache, duvida, texto, contexto)
+
+
+def evento_sse(dados, evento=None):
+    linhas = f"event: {evento}\n" if evento else ""
+    return f"{linhas}data: {json.dumps(dados, ensure_ascii=False)}\n\n"
+
+
+def responder_roboteca_em_stream(contexto, duvida):
+    """
+    Responde em Server-Sent Events: um evento `data` por pedaço de texto e,
+    no fim, um evento `fim` com a resposta completa. Erros antes do primeiro
+    byte seguem os mesmos códigos da rota JSON; erros no meio do caminho
+    viram um evento `erro`.
+    """
+    chave_cache = gerar_chave(contexto, duvida, GROQ_MODELO, GROQ_TEMPERATURA)
+    cabecalhos = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+    resposta_em_cache = cache_roboteca.obter(chave_cache)
+    if resposta_em_cache is not None:
+        def do_cache():
+            yield evento_sse({"token": resposta_em_cache})
+            yield evento_sse({"resposta_simplificada": resposta_em_cache}, "fim")
+
+        cabecalhos["X-Cache"] = "HIT"
+        return Response(do_cache(), mimetype="text/event-stream", headers=cabecalhos)
+
+    encontrado = buscar_no_indice(contexto, duvida)
+    if encontrado is not None:
+        def do_indice():
+            yield evento_sse({"token": encontrado[0]})
+            yield evento_sse({"resposta_simplificada": encontrado[0]}, "fim")
+
+        cabecalhos.update(cabecalhos_do_indice(encontrado))
+        return Response(do_indice(), mimetype="text/event-stream", headers=cabecalhos)
+
+    if not cliente_groq.api_key:
+        return jsonify({"erro": "API Key da Groq não configurada."}), 500
+
+    mensagens = [
+        {"role": "user", "content": montar_mensagem_roboteca(contexto, duvida)}
+    ]
+
+    # A vaga fica ocupada enquanto a resposta estiver sendo transmitida
+    try:
+        liberar_vaga = controle_groq.reservar_vaga()
+    except SobrecargaGroq as e:
+        print("RoboTeca sobrecarregada:", e)
+        return resposta_sobrecarga()
+
+    try:
+        partes = cliente_groq.completar_em_partes(mensagens, GROQ_MODELO, GROQ_TEMPERATURA)
+    except Exception as e:
+        liberar_vaga()
+        registrar_erro_groq(e)
+        return jsonify({"erro": MENSAGEM_ERRO_ROBOTECA}), 500
+
+    def gerar_eventos():
+        texto = []
+        try:
+            for parte in partes:
+                texto.append(parte)
+                yield evento_sse({"token": parte})
+        except Exception as e:
+            print("Erro no streaming da Groq:", e)
+            yield evento_sse({"erro": MENSAGEM_ERRO_ROBOTECA}, "erro")
+            return
+        finally:
+            liberar_vaga()
+
+        texto_resposta = "".join(texto)
+        guardar_resposta_groq(chave_cache, contexto, duvida, texto_resposta)
+        yield evento_sse({"resposta_simplificada": texto_resposta}, "fim")
+
+    cabecalhos["X-Cache"] = "MISS"
+    resposta = Response(gerar_eventos(), mimetype="text/event-stream", headers=cabecalhos)
+    # Se o cliente desconectar antes do primeiro byte o gerador nem começa
+    resposta.call_on_close(liberar_vaga)
+    return resposta
+
+
+@api.route("/ajuda-bot", methods=["POST"])
 def ajuda_bot():
     """
     Enviar dúvida para a RoboTeca (Groq API)
@@ -597,9 +1801,23 @@ def ajuda_bot():
             duvida:
               type: string
               example: "Não entendi por que h1 é diferente de p."
+    produces:
+      - application/json
+      - text/event-stream
     responses:
       200:
-        description: Resposta simplificada gerada pela RoboTeca
+        description: >
+          Resposta simplificada gerada pela RoboTeca. Com Accept: text/event-stream
+          a resposta vem em streaming, igual a /ajuda-bot/stream.
+        headers:
+          X-Cache:
+            type: string
+            description: >
+              HIT (cache de respostas), INDICE (índice local, sem chamar a Groq)
+              ou MISS (resposta nova da Groq)
+          X-Indice-Confianca:
+            type: number
+            description: Só com X-Cache INDICE, fração das palavras da dúvida encontradas
         schema:
           type: object
           properties:
@@ -609,6 +1827,8 @@ def ajuda_bot():
         description: Nenhuma dúvida enviada no corpo da requisição
       500:
         description: Erro ao falar com a Groq API ou chave não configurada
+      503:
+        description: Muitas dúvidas ao mesmo tempo, tente de novo em alguns segundos
     """
     dados = request.get_json()
 
@@ -619,61 +1839,115 @@ def ajuda_bot():
     if not duvida:
         return jsonify({"erro": "Nenhuma dúvida enviada"}), 400
 
-    mensagem = (
-        "Você é um robô tutor que ensina programação para crianças de 9 a 12 anos. "
-        "Use uma linguagem neutra quanto ao gênero, chame-os de crianças ou estudantes. "
-        "Use pronomes neutros com (a) ou (as)"
-        "Explique SEM termos técnicos complicados, usando exemplos simples, analogias "
-        "e linguagem divertida. Não use palavrões nem conteúdo sensível.\n\n"
-        f"Contexto da explicação ou desafio: {contexto}\n\n"
-        f"Dúvida da criança: {duvida}\n\n"
-        "Resposta:"
-    )
-
-    GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-    if not GROQ_API_KEY:
+    # O mesmo pedido pode ser atendido em streaming (SSE)
+    if request.accept_mimetypes.best_match(["application/json", "text/event-stream"]) == "text/event-stream":
+        return responder_roboteca_em_stream(contexto, duvida)
+
+    # Crianças no mesmo desafio perguntam quase a mesma coisa
+    chave_cache = gerar_chave(contexto, duvida, GROQ_MODELO, GROQ_TEMPERATURA)
+    resposta_em_cache = cache_roboteca.obter(chave_cache)
+    if resposta_em_cache is not None:
+        resposta = jsonify({"resposta_simplificada": resposta_em_cache})
+        resposta.headers["X-Cache"] = "HIT"
+        return resposta
+
+    # Dúvidas que o conteúdo (ou uma resposta antiga) já responde não vão para a Groq
+    encontrado = buscar_no_indice(contexto, duvida)
+    if encontrado is not None:
+        resposta = jsonify({"resposta_simplificada": encontrado[0]})
+        resposta.headers.update(cabecalhos_do_indice(encontrado))
+        return resposta
+
+    if not cliente_groq.api_key:
         return jsonify({"erro": "API Key da Groq não configurada."}), 500
 
-    url = "https://api.groq.com/openai/v1/chat/completions"
+    mensagens = [
+        {"role": "user", "content": montar_mensagem_roboteca(contexto, duvida)}
+    ]
 
-    payload = {
-        "model": "llama-3.1-8b-instant",
-        "messages": [
-            {"role": "user", "content": mensagem}
-        ],
-        "temperature": 0.4
-    }
-
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
+    def chamar_groq():
+        texto = cliente_groq.completar(mensagens, GROQ_MODELO, GROQ_TEMPERATURA)
+        guardar_resposta_groq(chave_cache, contexto, duvida, texto)
+        return texto
 
     try:
-        resposta = requests.post(url, json=payload, headers=headers, timeout=20)
+        # Perguntas iguais ao mesmo tempo dividem uma única chamada à Groq
+        texto_resposta = controle_groq.executar(chave_cache, chamar_groq)
 
-        if resposta.status_code != 200:
-            print("Groq status code:", resposta.status_code)
-            print("Groq response body:", resposta.text)
-            resposta.raise_for_status()
-
-        data = resposta.json()
-
-        texto_resposta = data["choices"][0]["message"]["content"]
-
-        return jsonify({
+        resposta = jsonify({
             "resposta_simplificada": texto_resposta
         })
+        resposta.headers["X-Cache"] = "MISS"
+        return resposta
+
+    except SobrecargaGroq as e:
+        print("RoboTeca sobrecarregada:", e)
+        return resposta_sobrecarga()
 
     except Exception as e:
-        print("Erro com a API da Groq:", e)
+        registrar_erro_groq(e)
         return jsonify({
-            "erro": "Não foi possível falar com o robô agora, tente novamente mais tarde."
+            "erro": MENSAGEM_ERRO_ROBOTECA
         }), 500
 
 
+@api.route("/ajuda-bot/stream", methods=["POST"])
+def ajuda_bot_stream():
+    """
+    Enviar dúvida para a RoboTeca com resposta em streaming (SSE)
+    ---
+    tags:
+      - RoboTeca
+    consumes:
+      - application/json
+    produces:
+      - text/event-stream
+    parameters:
+      - in: body
+        name: body
+        required: true
+        description: Dúvida da criança e contexto do desafio/explicação
+        schema:
+          type: object
+          required:
+            - duvida
+          properties:
+            usuario_id:
+              type: integer
+              example: 1
+            contexto:
+              type: string
+              example: "Explicação sobre HTML e tags de título."
+            duvida:
+              type: string
+              example: "Não entendi por que h1 é diferente de p."
+    responses:
+      200:
+        description: >
+          Eventos SSE. Cada evento sem nome traz {"token": "..."} com um pedaço
+          do texto; o evento "fim" traz {"resposta_simplificada": "..."} com a
+          resposta completa; o evento "erro" traz {"erro": "..."} se a conexão
+          com a Groq cair no meio da resposta.
+      400:
+        description: Nenhuma dúvida enviada no corpo da requisição
+      500:
+        description: Erro ao falar com a Groq API ou chave não configurada
+      503:
+        description: Muitas dúvidas ao mesmo tempo, tente de novo em alguns segundos
+    """
+    dados = request.get_json()
+
+    contexto = dados.get("contexto", "")
+    duvida = dados.get("duvida", "")
+
+    if not duvida:
+        return jsonify({"erro": "Nenhuma dúvida enviada"}), 400
+
+    return responder_roboteca_em_stream(contexto, duvida)
+
+
 # --- ROTA DE STATUS BÁSICA ---
-@app.route("/", methods=["GET"])
+@api.route("/", methods=["GET"])
 def status_api():
     """
     Status da API
@@ -698,7 +1972,231 @@ def status_api():
         "status": "ok"
     }), 200
 
+
+# --- ROTA DE ESTATÍSTICAS DO BANCO ---
+@api.route("/status/banco", methods=["GET"])
+def status_banco():
+    """
+    Estatísticas do pool de conexões SQLite
+    ---
+    tags:
+      - Status
+    responses:
+      200:
+        description: Contadores do pool de conexões
+        schema:
+          type: object
+          properties:
+            pool:
+              type: object
+              properties:
+                caminho:
+                  type: string
+                  example: database.db
+                tamanho_max:
+                  type: integer
+                livres:
+                  type: integer
+                em_uso:
+                  type: integer
+                criadas:
+                  type: integer
+                reutilizadas:
+                  type: integer
+                fechadas:
+                  type: integer
+            journal_mode:
+              type: string
+              example: wal
+            escrita_adiada:
+              type: object
+              description: Fila de gravações do modo CODEBRINCANDO_ESCRITA_ADIADA
+              properties:
+                habilitada:
+                  type: boolean
+                na_fila:
+                  type: integer
+                enfileiradas:
+                  type: integer
+                gravadas:
+                  type: integer
+                lotes:
+                  type: integer
+                maior_lote:
+                  type: integer
+                fila_cheia:
+                  type: integer
+                substituidas:
+                  type: integer
+                  description: Itens descartados por uma gravação direta mais nova
+                ignoradas:
+                  type: integer
+                  description: Itens não gravados porque o usuário foi removido
+                erros:
+                  type: integer
+                  description: Itens de lotes que falharam (voltam no lote seguinte)
+                perdidas:
+                  type: integer
+                  description: Itens que ainda falhavam no encerramento do worker
+            snapshot_leitura:
+              type: object
+              description: Cópia de leitura em memória (CODEBRINCANDO_SNAPSHOT_LEITURA)
+              properties:
+                habilitado:
+                  type: boolean
+                copia:
+                  type: integer
+                idade_copia_s:
+                  type: number
+                verificada_ha_s:
+                  type: number
+                ultima_duracao_ms:
+                  type: number
+                ultimo_atraso_ms:
+                  type: number
+                atualizacoes:
+                  type: integer
+                erros:
+                  type: integer
+            shards:
+              type: object
+              description: Arquivos de progresso (CODEBRINCANDO_SHARDS)
+              properties:
+                total:
+                  type: integer
+                  example: 4
+                pools:
+                  type: array
+                  description: Um pool por shard (vazio com um shard só)
+                  items:
+                    type: object
+    """
+    conn = get_db_conn()
+    journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    return jsonify({
+        "pool": pool.estatisticas(),
+        "journal_mode": journal_mode,
+        "escrita_adiada": escrita_adiada.estatisticas(),
+        "snapshot_leitura": snapshot_leitura.estatisticas(),
+        "shards": shards.estatisticas()
+    }), 200
+
+
+# --- ROTA DE ESTATÍSTICAS DO CACHE DA ROBOTECA ---
+@api.route("/status/roboteca", methods=["GET"])
+def status_roboteca():
+    """
+    Estatísticas do cache de respostas da RoboTeca e do cliente da Groq
+    ---
+    tags:
+      - Status
+    responses:
+      200:
+        description: Contadores do cache e latência das chamadas à Groq
+        schema:
+          type: object
+          properties:
+            cache:
+              type: object
+              properties:
+                acertos_memoria:
+                  type: integer
+                acertos_banco:
+                  type: integer
+                faltas:
+                  type: integer
+                gravacoes:
+                  type: integer
+                expirados:
+                  type: integer
+                removidos_memoria:
+                  type: integer
+                itens_memoria:
+                  type: integer
+                taxa_acerto:
+                  type: number
+                  example: 0.75
+            indice:
+              type: object
+              description: Índice local que responde dúvidas sem chamar a Groq
+              properties:
+                habilitado:
+                  type: boolean
+                limiar:
+                  type: number
+                termos_min:
+                  type: integer
+                documentos:
+                  type: integer
+                respostas_groq:
+                  type: integer
+                termos:
+                  type: integer
+                consultas:
+                  type: integer
+                acertos:
+                  type: integer
+                faltas:
+                  type: integer
+                taxa_acerto:
+                  type: number
+                  example: 0.4
+            groq:
+              type: object
+              properties:
+                chamadas:
+                  type: integer
+                sucessos:
+                  type: integer
+                falhas:
+                  type: integer
+                novas_tentativas:
+                  type: integer
+                respostas_por_status:
+                  type: object
+                latencia_ms:
+                  type: object
+                  properties:
+                    p50:
+                      type: number
+                    p95:
+                      type: number
+                    p99:
+                      type: number
+                    max:
+                      type: number
+            fila:
+              type: object
+              properties:
+                max_simultaneas:
+                  type: integer
+                max_fila:
+                  type: integer
+                em_andamento:
+                  type: integer
+                na_fila:
+                  type: integer
+                coalescendo:
+                  type: integer
+                executadas:
+                  type: integer
+                coalescidas:
+                  type: integer
+                rejeitadas:
+                  type: integer
+                espera_ms:
+                  type: object
+    """
+    return jsonify({
+        "cache": cache_roboteca.estatisticas(),
+        "indice": indice_roboteca.estatisticas(),
+        "groq": cliente_groq.estatisticas(),
+        "fila": controle_groq.estatisticas()
+    }), 200
+
+
+# Servidor de desenvolvimento. Em produção use o gunicorn (ver gunicorn.conf.py)
 if __name__ == "__main__":
-    init_db() 
-    app.run(host="0.0.0.0", port=5001)
+    init_db()
+    create_app().run(host="0.0.0.0", port=5001)
 
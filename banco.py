@@ -0,0 +1,166 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+
+# Caminho do banco e ajustes do pool (podem ser trocados por variáveis de ambiente)
+DB_PATH = os.getenv("CODEBRINCANDO_DB", "database.db")
+POOL_TAMANHO = int(os.getenv("CODEBRINCANDO_DB_POOL", "8"))
+BUSY_TIMEOUT_MS = int(os.getenv("CODEBRINCANDO_DB_BUSY_TIMEOUT_MS", "5000"))
+
+# Pragmas aplicados em toda conexão nova.
+# WAL deixa leitores e o escritor trabalharem ao mesmo tempo e
+# synchronous=NORMAL só faz fsync no checkpoint, não em todo commit.
+# foreign_keys vem desligado por padrão no SQLite; sem ele o ON DELETE
+# CASCADE de progresso_usuarios não acontece.
+PRAGMAS = (
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA temp_store = MEMORY",
+)
+
+
+# Funções chamadas com (sql, duracao_em_segundos) a cada comando executado.
+# Usado pelas métricas (ver metricas.py); vazio, não custa nada.
+ouvintes_sql = []
+
+
+def _avisar_ouvintes(sql, inicio):
+    duracao = time.perf_counter() - inicio
+    for ouvinte in ouvintes_sql:
+        ouvinte(sql, duracao)
+
+
+class CursorInstrumentado(sqlite3.Cursor):
+    def execute(self, sql, parametros=()):
+        if not ouvintes_sql:
+            return super().execute(sql, parametros)
+        inicio = time.perf_counter()
+        try:
+            return super().execute(sql, parametros)
+        finally:
+            _avisar_ouvintes(sql, inicio)
+
+    def executemany(self, sql, parametros):
+        if not ouvintes_sql:
+            return super().executemany(sql, parametros)
+        inicio = time.perf_counter()
+        try:
+            return super().executemany(sql, parametros)
+        finally:
+            _avisar_ouvintes(sql, inicio)
+
+
+class ConexaoInstrumentada(sqlite3.Connection):
+    """Conexão cujos comandos (inclusive via cursor()) avisam ouvintes_sql."""
+
+    def cursor(self, factory=CursorInstrumentado):
+        return super().cursor(factory)
+
+    def execute(self, sql, parametros=()):
+        return self.cursor().execute(sql, parametros)
+
+    def executemany(self, sql, parametros):
+        return self.cursor().executemany(sql, parametros)
+
+
+def abrir_conexao(caminho=None, anexos=None):
+    """
+    Abre uma conexão SQLite já configurada com os pragmas do projeto.
+    `anexos` ({nome: caminho}) são outros bancos anexados com ATTACH.
+    """
+    conn = sqlite3.connect(
+        caminho or DB_PATH,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        check_same_thread=False,
+        factory=ConexaoInstrumentada,
+    )
+    conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    for nome, caminho_anexo in (anexos or {}).items():
+        conn.execute(f"ATTACH DATABASE ? AS {nome}", (caminho_anexo,))
+    return conn
+
+
+class PoolConexoes:
+    """
+    Pool simples de conexões SQLite.
+
+    As conexões são reaproveitadas entre requisições: quem pega uma conexão
+    com `obter()` precisa devolvê-la com `devolver()`. Se o pool estiver cheio
+    na devolução, a conexão excedente é fechada.
+    """
+
+    def __init__(self, caminho=None, tamanho_max=POOL_TAMANHO, anexos=None):
+        self.caminho = caminho or DB_PATH
+        self.tamanho_max = tamanho_max
+        self.anexos = anexos
+        self._livres = queue.LifoQueue(maxsize=tamanho_max)
+        self._lock = threading.Lock()
+        self._criadas = 0
+        self._reutilizadas = 0
+        self._em_uso = 0
+        self._fechadas = 0
+
+    def obter(self):
+        try:
+            conn = self._livres.get_nowait()
+            reutilizada = True
+        except queue.Empty:
+            conn = abrir_conexao(self.caminho, self.anexos)
+            reutilizada = False
+
+        with self._lock:
+            if reutilizada:
+                self._reutilizadas += 1
+            else:
+                self._criadas += 1
+            self._em_uso += 1
+        return conn
+
+    def devolver(self, conn):
+        # Nunca devolvemos uma conexão com transação pela metade
+        if conn.in_transaction:
+            conn.rollback()
+
+        with self._lock:
+            self._em_uso -= 1
+
+        try:
+            self._livres.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+            with self._lock:
+                self._fechadas += 1
+
+    def fechar_todas(self):
+        while True:
+            try:
+                conn = self._livres.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._fechadas += 1
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "caminho": self.caminho,
+                "tamanho_max": self.tamanho_max,
+                "livres": self._livres.qsize(),
+                "em_uso": self._em_uso,
+                "criadas": self._criadas,
+                "reutilizadas": self._reutilizadas,
+                "fechadas": self._fechadas,
+            }
+
+
+pool = PoolConexoes()
@@ -0,0 +1,314 @@
+"""
+Teste de carga das rotas da API do CodeBrincando.
+
+Cria um banco temporário com N usuários e M desafios, sobe a API com o
+gunicorn apontando a RoboTeca para uma Groq falsa (benchmarks/groq_falso.py)
+e dispara cada rota com a concorrência escolhida. Mostra p50/p95/p99 e
+requisições por segundo e grava tudo em JSON para comparar commits.
+
+    python benchmarks/executar.py --usuarios 2000 --desafios 500 --concorrencia 32
+    python benchmarks/executar.py --cenarios progresso_listar,explicacoes --requisicoes 5000
+    CODEBRINCANDO_SHARDS=4 python benchmarks/executar.py --cenarios progresso_enviar
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from migracoes import aplicar_migracoes  # noqa: E402
+from shards import SHARDS, rebalancear  # noqa: E402
+from benchmarks.groq_falso import iniciar_em_thread  # noqa: E402
+
+
+# --- BANCO DE TESTE ---
+def popular_banco(caminho, usuarios, desafios, progresso_por_usuario=3):
+    """Cria o schema e insere usuários, desafios e um pouco de progresso."""
+    conn = sqlite3.connect(caminho)
+    aplicar_migracoes(conn)
+
+    with conn:
+        conn.executemany(
+            "INSERT INTO usuarios (nome, idade) VALUES (?, ?)",
+            [(f"Criança {i}", random.randint(8, 12)) for i in range(usuarios)]
+        )
+        existentes = conn.execute("SELECT COUNT(*) FROM desafios").fetchone()[0]
+        novos = []
+        for i in range(max(0, desafios - existentes)):
+            if i % 2:
+                novos.append((
+                    f"Desafio CSS {i}", "css",
+                    f"Pinte o fundo do parágrafo {i} de azul.<br><br> DESAFIO <br> " + "texto " * 80,
+                    "p { color: blue; }",
+                    "p { background-color: blue; }"
+                ))
+            else:
+                novos.append((
+                    f"Desafio HTML {i}", "html",
+                    f"Use a tag &lt;h2&gt; para o título {i}.<br><br> DESAFIO <br> " + "texto " * 80,
+                    f"<titulo>Título {i}</titulo>",
+                    f"<h2>Título {i}</h2>"
+                ))
+        conn.executemany(
+            "INSERT INTO desafios (nome, linguagem, instrucao, codigo_bugado, codigo_esperado) "
+            "VALUES (?, ?, ?, ?, ?)",
+            novos
+        )
+
+        ids_usuarios = [row[0] for row in conn.execute("SELECT id FROM usuarios")]
+        ids_desafios = [row[0] for row in conn.execute("SELECT id FROM desafios")]
+        progresso = set()
+        for usuario_id in ids_usuarios:
+            for desafio_id in random.sample(ids_desafios, min(progresso_por_usuario, len(ids_desafios))):
+                progresso.add((usuario_id, desafio_id))
+        conn.executemany(
+            "INSERT INTO progresso_usuarios (usuario_id, desafio_id, status, data_conclusao) "
+            "VALUES (?, ?, 'concluido', CURRENT_TIMESTAMP)",
+            sorted(progresso)
+        )
+
+    conn.close()
+    # Com CODEBRINCANDO_SHARDS > 1 o progresso vai para os arquivos de shard
+    if SHARDS > 1:
+        rebalancear(SHARDS, principal=caminho)
+    return ids_usuarios, ids_desafios
+
+
+# --- CENÁRIOS ---
+# Cada cenário devolve (método, caminho, corpo JSON) para uma requisição
+def criar_cenarios(ids_usuarios, ids_desafios, duvidas_distintas):
+    def progresso_listar():
+        return "GET", f"/progresso/{random.choice(ids_usuarios)}", None
+
+    def progresso_enviar():
+        return "POST", "/progresso", {
+            "usuario_id": random.choice(ids_usuarios),
+            "desafio_id": random.choice(ids_desafios),
+            "codigo_submetido": random.choice(["<h1>Olá, Mundo!</h1>", "<p>errado"])
+        }
+
+    def explicacoes():
+        return "GET", "/explicacoes", None
+
+    def cadastrar_usuario():
+        return "POST", "/cadastrar_usuario", {"nome": "Nova criança", "idade": 9}
+
+    def ajuda_bot():
+        return "POST", "/ajuda-bot", {
+            "contexto": "Explicação sobre HTML e tags de título.",
+            "duvida": f"O que é uma tag? ({random.randrange(duvidas_distintas)})"
+        }
+
+    return {
+        "progresso_listar": progresso_listar,
+        "progresso_enviar": progresso_enviar,
+        "explicacoes": explicacoes,
+        "cadastrar_usuario": cadastrar_usuario,
+        "ajuda_bot": ajuda_bot,
+    }
+
+
+# --- CARGA ---
+_sessoes = threading.local()
+
+
+def _sessao():
+    if not hasattr(_sessoes, "sessao"):
+        _sessoes.sessao = requests.Session()
+    return _sessoes.sessao
+
+
+def _disparar(url_base, cenario):
+    metodo, caminho, corpo = cenario()
+    inicio = time.perf_counter()
+    try:
+        resposta = _sessao().request(metodo, url_base + caminho, json=corpo, timeout=60)
+        status = resposta.status_code
+        tamanho = len(resposta.content)
+    except requests.RequestException:
+        status = 0
+        tamanho = 0
+    return time.perf_counter() - inicio, status, tamanho
+
+
+def percentil(valores_ordenados, p):
+    if not valores_ordenados:
+        return None
+    indice = min(len(valores_ordenados) - 1, int(p * len(valores_ordenados)))
+    return valores_ordenados[indice]
+
+
+def executar_cenario(url_base, cenario, requisicoes, concorrencia, aquecimento):
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        list(executor.map(lambda _: _disparar(url_base, cenario), range(aquecimento)))
+
+        inicio = time.perf_counter()
+        medidas = list(executor.map(lambda _: _disparar(url_base, cenario), range(requisicoes)))
+        duracao = time.perf_counter() - inicio
+
+    latencias = sorted(m[0] for m in medidas)
+    por_status = {}
+    for _, status, _ in medidas:
+        por_status[str(status)] = por_status.get(str(status), 0) + 1
+
+    def ms(valor):
+        return round(valor * 1000, 2) if valor is not None else None
+
+    return {
+        "requisicoes": requisicoes,
+        "concorrencia": concorrencia,
+        "duracao_s": round(duracao, 3),
+        "rps": round(requisicoes / duracao, 1) if duracao else None,
+        "latencia_ms": {
+            "p50": ms(percentil(latencias, 0.50)),
+            "p95": ms(percentil(latencias, 0.95)),
+            "p99": ms(percentil(latencias, 0.99)),
+            "max": ms(latencias[-1]) if latencias else None,
+            "media": ms(sum(latencias) / len(latencias)) if latencias else None,
+        },
+        "bytes_medio": round(sum(m[2] for m in medidas) / len(medidas)) if medidas else 0,
+        "por_status": por_status,
+    }
+
+
+# --- SERVIDOR ---
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def subir_api(caminho_banco, url_groq, workers, threads):
+    porta = porta_livre()
+    ambiente = dict(
+        os.environ,
+        CODEBRINCANDO_DB=caminho_banco,
+        CODEBRINCANDO_DOCS="0",
+        GROQ_BASE_URL=url_groq,
+        GROQ_API_KEY="chave-falsa",
+    )
+    processo = subprocess.Popen(
+        [
+            sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+            "-b", f"127.0.0.1:{porta}", "-w", str(workers), "--threads", str(threads),
+            "--access-logfile", "/dev/null",
+        ],
+        cwd=RAIZ, env=ambiente,
+    )
+
+    url_base = f"http://127.0.0.1:{porta}"
+    limite = time.time() + 30
+    while time.time() < limite:
+        if processo.poll() is not None:
+            raise RuntimeError("O gunicorn terminou antes de responder")
+        try:
+            if requests.get(url_base + "/", timeout=1).status_code == 200:
+                return processo, url_base
+        except requests.RequestException:
+            time.sleep(0.2)
+    processo.terminate()
+    raise RuntimeError("A API não respondeu em 30 s")
+
+
+def commit_atual():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--usuarios", type=int, default=1000)
+    parser.add_argument("--desafios", type=int, default=100)
+    parser.add_argument("--requisicoes", type=int, default=2000, help="por cenário")
+    parser.add_argument("--aquecimento", type=int, default=100, help="requisições ignoradas antes de medir")
+    parser.add_argument("--concorrencia", type=int, default=16)
+    parser.add_argument("--cenarios", default="progresso_listar,progresso_enviar,explicacoes,cadastrar_usuario,ajuda_bot")
+    parser.add_argument("--latencia-groq", type=float, default=0.3)
+    parser.add_argument("--duvidas-distintas", type=int, default=50,
+                        help="quantas dúvidas diferentes o cenário ajuda_bot sorteia")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--url", help="usa uma API já rodando (não cria banco nem sobe o gunicorn)")
+    parser.add_argument("--saida", help="arquivo JSON de resultados (padrão: benchmarks/resultados/<data>.json)")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.semente)
+    nomes = [nome.strip() for nome in args.cenarios.split(",") if nome.strip()]
+
+    processo = None
+    servidor_groq = None
+    with tempfile.TemporaryDirectory() as pasta:
+        if args.url:
+            url_base = args.url.rstrip("/")
+            ids_usuarios = list(range(1, args.usuarios + 1))
+            ids_desafios = list(range(1, args.desafios + 1))
+        else:
+            caminho_banco = os.path.join(pasta, "benchmark.db")
+            print(f"Populando banco com {args.usuarios} usuários e {args.desafios} desafios...")
+            ids_usuarios, ids_desafios = popular_banco(caminho_banco, args.usuarios, args.desafios)
+
+            servidor_groq = iniciar_em_thread(latencia=args.latencia_groq)
+            url_groq = f"http://127.0.0.1:{servidor_groq.server_port}"
+            processo, url_base = subir_api(caminho_banco, url_groq, args.workers, args.threads)
+
+        cenarios = criar_cenarios(ids_usuarios, ids_desafios, args.duvidas_distintas)
+        desconhecidos = set(nomes) - set(cenarios)
+        if desconhecidos:
+            parser.error(f"cenários desconhecidos: {', '.join(sorted(desconhecidos))}")
+
+        resultados = {}
+        try:
+            for nome in nomes:
+                print(f"-> {nome}")
+                resultado = executar_cenario(
+                    url_base, cenarios[nome], args.requisicoes, args.concorrencia, args.aquecimento
+                )
+                resultados[nome] = resultado
+                lat = resultado["latencia_ms"]
+                print(
+                    f"   {resultado['rps']:>8} req/s   p50 {lat['p50']} ms   "
+                    f"p95 {lat['p95']} ms   p99 {lat['p99']} ms   status {resultado['por_status']}"
+                )
+        finally:
+            if processo is not None:
+                processo.terminate()
+                processo.wait(timeout=30)
+            if servidor_groq is not None:
+                servidor_groq.shutdown()
+
+    relatorio = {
+        "commit": commit_atual(),
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "parametros": vars(args),
+        "resultados": resultados,
+    }
+
+    saida = args.saida or os.path.join(
+        RAIZ, "benchmarks", "resultados", datetime.now().strftime("%Y%m%d-%H%M%S") + ".json"
+    )
+    os.makedirs(os.path.dirname(saida) or ".", exist_ok=True)
+    with open(saida, "w", encoding="utf-8") as arquivo:
+        json.dump(relatorio, arquivo, ensure_ascii=False, indent=2)
+    print(f"Resultados gravados em {saida}")
+
+
+if __name__ == "__main__":
+    main()
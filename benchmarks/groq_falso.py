@@ -0,0 +1,115 @@
+"""
+Servidor falso da Groq para testes de carga.
+
+Responde /chat/completions no formato da API real (com e sem `stream`),
+esperando uma latência configurável antes de responder.
+
+    python benchmarks/groq_falso.py --porta 8799 --latencia 0.3
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class ManipuladorGroqFalso(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    # Ajustados por criar_servidor()
+    latencia = 0.3
+    variacao = 0.0
+    pedacos = 8
+
+    def do_POST(self):
+        tamanho = int(self.headers.get("Content-Length", 0))
+        corpo = json.loads(self.rfile.read(tamanho) or b"{}")
+
+        if not self.path.endswith("/chat/completions"):
+            self._responder(404, {"error": "not found"})
+            return
+
+        espera = max(0.0, self.latencia + random.uniform(-self.variacao, self.variacao))
+        texto = "Uma tag é como uma etiqueta que diz ao computador o que cada pedaço é!"
+
+        if corpo.get("stream"):
+            self._responder_em_stream(texto, espera)
+            return
+
+        time.sleep(espera)
+        self._responder(200, {
+            "id": "chatcmpl-falso",
+            "object": "chat.completion",
+            "model": corpo.get("model"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": texto},
+                "finish_reason": "stop"
+            }]
+        })
+
+    def _responder(self, status, dados):
+        saida = json.dumps(dados).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(saida)))
+        self.end_headers()
+        self.wfile.write(saida)
+
+    def _responder_em_stream(self, texto, espera):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        # O cliente fecha o socket depois do [DONE]: sem isso o servidor
+        # tentaria ler o próximo pedido e imprimiria ConnectionResetError
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        palavras = texto.split(" ")
+        tamanho = max(1, len(palavras) // self.pedacos)
+        grupos = [" ".join(palavras[i:i + tamanho]) + " " for i in range(0, len(palavras), tamanho)]
+
+        for grupo in grupos:
+            time.sleep(espera / len(grupos))
+            evento = {"choices": [{"index": 0, "delta": {"content": grupo}}]}
+            self._escrever_pedaco(f"data: {json.dumps(evento)}\n\n".encode("utf-8"))
+        self._escrever_pedaco(b"data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _escrever_pedaco(self, dados):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(dados), dados))
+        self.wfile.flush()
+
+    def log_message(self, formato, *args):
+        pass
+
+
+def criar_servidor(porta=0, latencia=0.3, variacao=0.0):
+    """Cria o servidor (porta 0 = qualquer porta livre) sem iniciá-lo."""
+    manipulador = type("Manipulador", (ManipuladorGroqFalso,), {
+        "latencia": latencia,
+        "variacao": variacao,
+    })
+    servidor = ThreadingHTTPServer(("127.0.0.1", porta), manipulador)
+    servidor.daemon_threads = True
+    return servidor
+
+
+def iniciar_em_thread(porta=0, latencia=0.3, variacao=0.0):
+    servidor = criar_servidor(porta, latencia, variacao)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--porta", type=int, default=8799)
+    parser.add_argument("--latencia", type=float, default=0.3, help="segundos por resposta")
+    parser.add_argument("--variacao", type=float, default=0.0, help="± segundos sorteados")
+    args = parser.parse_args()
+
+    servidor = criar_servidor(args.porta, args.latencia, args.variacao)
+    print(f"Groq falsa em http://127.0.0.1:{servidor.server_port} (latência {args.latencia}s)")
+    servidor.serve_forever()
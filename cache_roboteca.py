@@ -0,0 +1,217 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from banco import pool
+
+
+CACHE_MEMORIA_MAX = int(os.getenv("ROBOTECA_CACHE_MEMORIA_MAX", "1000"))
+CACHE_MEMORIA_TTL = int(os.getenv("ROBOTECA_CACHE_MEMORIA_TTL", "3600"))
+CACHE_BANCO_MAX = int(os.getenv("ROBOTECA_CACHE_BANCO_MAX", "20000"))
+CACHE_BANCO_TTL = int(os.getenv("ROBOTECA_CACHE_BANCO_TTL", str(7 * 24 * 3600)))
+
+# A limpeza do banco por tamanho roda a cada tantas gravações
+PODAR_A_CADA = 50
+# Um acerto no banco só atualiza acessado_em se a última marca for mais
+# antiga que isso: a poda por tamanho não precisa de precisão de segundos
+ROBOTECA_CACHE_TOQUE_S = int(os.getenv("ROBOTECA_CACHE_TOQUE_S", "600"))
+
+_ESPACOS = re.compile(r"\s+")
+_PONTUACAO_FINAL = re.compile(r"[\s?!.,;:]+$")
+
+
+def normalizar_pergunta(texto):
+    """Minúsculas, sem acentos, espaços colapsados e sem pontuação no fim."""
+    texto = unicodedata.normalize("NFKD", texto or "")
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    texto = _ESPACOS.sub(" ", texto.lower()).strip()
+    return _PONTUACAO_FINAL.sub("", texto)
+
+
+def gerar_chave(contexto, duvida, modelo, temperatura):
+    partes = [normalizar_pergunta(contexto), normalizar_pergunta(duvida), modelo, temperatura]
+    return hashlib.sha256(json.dumps(partes).encode("utf-8")).hexdigest()
+
+
+def chave_contexto(contexto):
+    """Hash do contexto normalizado (o mesmo contexto gera a mesma chave)."""
+    return hashlib.sha256(normalizar_pergunta(contexto).encode("utf-8")).hexdigest()
+
+
+class CacheRoboTeca:
+    """
+    Cache de respostas da RoboTeca em dois níveis:
+
+    1. memória do processo (LRU, com TTL e limite de itens);
+    2. tabela `respostas_roboteca` no SQLite, compartilhada entre processos
+       e mantida entre reinícios (TTL e limite de linhas).
+
+    Um acerto no banco também aquece a memória.
+    """
+
+    def __init__(self, memoria_max=CACHE_MEMORIA_MAX, memoria_ttl=CACHE_MEMORIA_TTL,
+                 banco_max=CACHE_BANCO_MAX, banco_ttl=CACHE_BANCO_TTL):
+        self.memoria_max = memoria_max
+        self.memoria_ttl = memoria_ttl
+        self.banco_max = banco_max
+        self.banco_ttl = banco_ttl
+
+        self._memoria = OrderedDict()
+        self._lock = threading.Lock()
+        self._gravacoes_desde_poda = 0
+        self.contadores = {
+            "acertos_memoria": 0,
+            "acertos_banco": 0,
+            "faltas": 0,
+            "gravacoes": 0,
+            "expirados": 0,
+            "removidos_memoria": 0,
+        }
+
+    def _contar(self, nome, quantidade=1):
+        with self._lock:
+            self.contadores[nome] += quantidade
+
+    def obter(self, chave):
+        agora = time.time()
+
+        with self._lock:
+            item = self._memoria.get(chave)
+            if item is not None:
+                resposta, expira_em = item
+                if expira_em > agora:
+                    self._memoria.move_to_end(chave)
+                    self.contadores["acertos_memoria"] += 1
+                    return resposta
+                del self._memoria[chave]
+                self.contadores["expirados"] += 1
+
+        resposta = self._obter_do_banco(chave, agora)
+        if resposta is not None:
+            self._contar("acertos_banco")
+            self._guardar_na_memoria(chave, resposta, agora)
+            return resposta
+
+        self._contar("faltas")
+        return None
+
+    def guardar(self, chave, resposta, pergunta=None, contexto=None):
+        agora = time.time()
+        self._guardar_na_memoria(chave, resposta, agora)
+
+        conn = pool.obter()
+        try:
+            with conn:
+                conn.execute(
+                    """
+                    INSERT INTO respostas_roboteca
+                        (chave, resposta, criado_em, acessado_em, pergunta, contexto)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (chave) DO UPDATE SET
+                        resposta = excluded.resposta,
+                        criado_em = excluded.criado_em,
+                        acessado_em = excluded.acessado_em,
+                        pergunta = excluded.pergunta,
+                        contexto = excluded.contexto
+                    """,
+                    (chave, resposta, agora, agora, pergunta,
+                     chave_contexto(contexto) if contexto is not None else None)
+                )
+        finally:
+            pool.devolver(conn)
+
+        self._contar("gravacoes")
+        with self._lock:
+            self._gravacoes_desde_poda += 1
+            podar = self._gravacoes_desde_poda >= PODAR_A_CADA
+            if podar:
+                self._gravacoes_desde_poda = 0
+        if podar:
+            self.podar_banco()
+
+    def podar_banco(self):
+        """Remove do banco o que expirou e o que passou do limite de linhas."""
+        conn = pool.obter()
+        try:
+            with conn:
+                conn.execute(
+                    "DELETE FROM respostas_roboteca WHERE criado_em < ?",
+                    (time.time() - self.banco_ttl,)
+                )
+                conn.execute(
+                    """
+                    DELETE FROM respostas_roboteca WHERE chave IN (
+                        SELECT chave FROM respostas_roboteca
+                        ORDER BY acessado_em DESC
+                        LIMIT -1 OFFSET ?
+                    )
+                    """,
+                    (self.banco_max,)
+                )
+        finally:
+            pool.devolver(conn)
+
+    def limpar_memoria(self):
+        with self._lock:
+            self._memoria.clear()
+
+    def estatisticas(self):
+        with self._lock:
+            dados = dict(self.contadores)
+            dados["itens_memoria"] = len(self._memoria)
+        consultas = dados["acertos_memoria"] + dados["acertos_banco"] + dados["faltas"]
+        dados["taxa_acerto"] = (
+            round((dados["acertos_memoria"] + dados["acertos_banco"]) / consultas, 4)
+            if consultas else 0.0
+        )
+        return dados
+
+    def _guardar_na_memoria(self, chave, resposta, agora):
+        with self._lock:
+            self._memoria[chave] = (resposta, agora + self.memoria_ttl)
+            self._memoria.move_to_end(chave)
+            while len(self._memoria) > self.memoria_max:
+                self._memoria.popitem(last=False)
+                self.contadores["removidos_memoria"] += 1
+
+    def _obter_do_banco(self, chave, agora):
+        conn = pool.obter()
+        try:
+            linha = conn.execute(
+                "SELECT resposta, criado_em, acessado_em FROM respostas_roboteca WHERE chave = ?",
+                (chave,)
+            ).fetchone()
+            if linha is None:
+                return None
+
+            expirado = linha["criado_em"] < agora - self.banco_ttl
+            # As escritas no caminho de leitura são só manutenção: se o banco
+            # estiver ocupado, ficam para a próxima (a poda cuida do resto)
+            try:
+                if expirado:
+                    with conn:
+                        conn.execute("DELETE FROM respostas_roboteca WHERE chave = ?", (chave,))
+                elif linha["acessado_em"] < agora - ROBOTECA_CACHE_TOQUE_S:
+                    with conn:
+                        conn.execute(
+                            "UPDATE respostas_roboteca SET acessado_em = ? WHERE chave = ?",
+                            (agora, chave)
+                        )
+            except sqlite3.Error as e:
+                print(f"Erro ao atualizar o cache da RoboTeca (ignorado): {e}")
+
+            if expirado:
+                self._contar("expirados")
+                return None
+            return linha["resposta"]
+        finally:
+            pool.devolver(conn)
+
+
+cache_roboteca = CacheRoboTeca()
@@ -0,0 +1,103 @@
+import hashlib
+import threading
+from collections import defaultdict
+
+from banco import pool
+from serializacao import como_dicts, cursor_de_tuplas, serializar
+from verificadores import normalizar
+
+
+def gerar_etag(*partes):
+    h = hashlib.sha256()
+    for parte in partes:
+        h.update(parte)
+        h.update(b"\0")
+    return h.hexdigest()[:32]
+
+
+class Catalogo:
+    """
+    Foto imutável do conteúdo estático (desafios e explicações).
+
+    Tudo que é derivado do conteúdo (JSON já serializado, ETags e gabaritos
+    normalizados) é calculado uma única vez, na carga.
+    """
+
+    def __init__(self, desafios, explicacoes):
+        self.desafios = {d["id"]: d for d in desafios}
+        self.desafios_ordenados = sorted(desafios, key=lambda d: d["id"])
+        self.ids_ordenados = [d["id"] for d in self.desafios_ordenados]
+        self.explicacoes = explicacoes
+
+        # Listas já ordenadas por id para cada linguagem (paginação por bisect)
+        por_linguagem = defaultdict(list)
+        for desafio in self.desafios_ordenados:
+            por_linguagem[desafio["linguagem"]].append(desafio)
+        self.por_linguagem = {
+            linguagem: (lista, [d["id"] for d in lista])
+            for linguagem, lista in por_linguagem.items()
+        }
+
+        # Gabaritos já normalizados: corrigir custa só normalizar a submissão
+        self.gabaritos = {
+            d["id"]: normalizar(d["linguagem"], d["codigo_esperado"])
+            for d in desafios
+        }
+
+        self.corpo_explicacoes = serializar(explicacoes)
+        self.etag_explicacoes = gerar_etag(self.corpo_explicacoes)
+        self.etag_desafios = gerar_etag(serializar(self.desafios_ordenados))
+
+    def desafios_da_linguagem(self, linguagem=None):
+        """Retorna (desafios, ids) ordenados por id, opcionalmente de uma linguagem."""
+        if linguagem is None:
+            return self.desafios_ordenados, self.ids_ordenados
+        return self.por_linguagem.get(linguagem, ([], []))
+
+
+class CacheCatalogo:
+    """
+    Cache do catálogo compartilhado pelo processo inteiro.
+
+    Carrega do SQLite na primeira leitura e só recarrega depois de
+    `invalidar()`, que deve ser chamado sempre que o conteúdo mudar.
+    """
+
+    def __init__(self):
+        self._catalogo = None
+        self._lock = threading.Lock()
+        self.cargas = 0
+
+    def obter(self):
+        catalogo = self._catalogo
+        if catalogo is not None:
+            return catalogo
+
+        with self._lock:
+            if self._catalogo is None:
+                self._catalogo = self._carregar()
+                self.cargas += 1
+            return self._catalogo
+
+    def invalidar(self):
+        with self._lock:
+            self._catalogo = None
+
+    def _carregar(self):
+        conn = pool.obter()
+        try:
+            cursor = cursor_de_tuplas(conn)
+            desafios = como_dicts(cursor, cursor.execute(
+                "SELECT id, nome, linguagem, instrucao, codigo_bugado, codigo_esperado "
+                "FROM desafios ORDER BY id"
+            ))
+            explicacoes = como_dicts(cursor, cursor.execute(
+                "SELECT id, tipo, titulo, texto, codigo FROM explicacoes ORDER BY id"
+            ))
+        finally:
+            pool.devolver(conn)
+
+        return Catalogo(desafios, explicacoes)
+
+
+catalogo = CacheCatalogo()
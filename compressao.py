@@ -0,0 +1,138 @@
+import gzip
+import os
+import threading
+from collections import OrderedDict
+
+from flask import request
+
+# brotli é opcional: sem ele só o gzip é oferecido
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Corpos menores que isso não compensam o custo de comprimir
+COMPRESSAO_MIN = int(os.getenv("CODEBRINCANDO_COMPRESSAO_MIN", "1024"))
+# Quantos corpos já comprimidos (por ETag e codificação) ficam em memória
+COMPRESSAO_CACHE_MAX = int(os.getenv("CODEBRINCANDO_COMPRESSAO_CACHE_MAX", "256"))
+
+TIPOS_COMPRIMIVEIS = {
+    "application/json",
+    "application/javascript",
+    "text/html",
+    "text/css",
+    "text/plain",
+}
+
+# Em ordem de preferência quando o cliente aceita as duas
+CODIFICACOES = ("br", "gzip") if brotli is not None else ("gzip",)
+
+# Níveis por codificação: um mais leve para corpos que mudam a cada resposta e
+# um mais forte para os que vão para o cache (comprimidos uma vez só)
+NIVEIS = {
+    "br": {"dinamico": 4, "cache": 8},
+    "gzip": {"dinamico": 6, "cache": 9},
+}
+
+
+def comprimir(corpo, codificacao, nivel="dinamico"):
+    qualidade = NIVEIS[codificacao][nivel]
+    if codificacao == "br":
+        return brotli.compress(corpo, quality=qualidade)
+    # mtime=0: o mesmo corpo sempre gera os mesmos bytes
+    return gzip.compress(corpo, compresslevel=qualidade, mtime=0)
+
+
+def escolher_codificacao():
+    """Melhor codificação aceita pelo cliente (Accept-Encoding), ou None."""
+    return request.accept_encodings.best_match(CODIFICACOES)
+
+
+class CacheCompressao:
+    """
+    Corpos já comprimidos, indexados por (ETag, codificação).
+
+    Uma ETag forte identifica os bytes exatos do corpo, então o mesmo
+    conteúdo (catálogo, explicações) é comprimido uma única vez por processo.
+    """
+
+    def __init__(self, tamanho_max=COMPRESSAO_CACHE_MAX):
+        self.tamanho_max = tamanho_max
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter_ou_comprimir(self, etag, codificacao, corpo):
+        chave = (etag, codificacao)
+        with self._lock:
+            comprimido = self._itens.get(chave)
+            if comprimido is not None:
+                self._itens.move_to_end(chave)
+                return comprimido
+
+        comprimido = comprimir(corpo, codificacao, "cache")
+        with self._lock:
+            self._itens[chave] = comprimido
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.tamanho_max:
+                self._itens.popitem(last=False)
+        return comprimido
+
+
+cache_compressao = CacheCompressao()
+
+
+def guardar_comprimida(resposta):
+    """
+    Marca uma resposta com ETag forte cujo corpo é o mesmo para todo mundo
+    (catálogo, spec): a versão comprimida vai para o cache_compressao.
+    """
+    resposta.comprimir_em_cache = True
+    return resposta
+
+
+def _comprimir_resposta(resposta):
+    etag, fraca = resposta.get_etag()
+
+    if resposta.status_code == 304:
+        # O 304 precisa trazer a mesma ETag que o 200 comprimido traria
+        resposta.vary.add("Accept-Encoding")
+        if etag and not fraca and escolher_codificacao():
+            resposta.set_etag(etag, weak=True)
+        return resposta
+
+    if resposta.mimetype not in TIPOS_COMPRIMIVEIS:
+        return resposta
+    resposta.vary.add("Accept-Encoding")
+
+    if (resposta.status_code != 200 or request.method == "HEAD"
+            or resposta.direct_passthrough or resposta.is_streamed
+            or "Content-Encoding" in resposta.headers):
+        return resposta
+
+    codificacao = escolher_codificacao()
+    if codificacao is None:
+        return resposta
+
+    corpo = resposta.get_data()
+    if len(corpo) < COMPRESSAO_MIN:
+        return resposta
+
+    # Corpos por usuário (/progresso) não vão para o cache: seriam
+    # comprimidos no nível alto para quase nunca serem reaproveitados
+    if etag and not fraca and getattr(resposta, "comprimir_em_cache", False):
+        comprimido = cache_compressao.obter_ou_comprimir(etag, codificacao, corpo)
+    else:
+        comprimido = comprimir(corpo, codificacao)
+    if etag and not fraca:
+        # Mesmo conteúdo, outros bytes: a ETag forte passa a ser fraca
+        resposta.set_etag(etag, weak=True)
+
+    resposta.set_data(comprimido)
+    resposta.headers["Content-Encoding"] = codificacao
+    return resposta
+
+
+def habilitar_compressao(app):
+    """Comprime (gzip/brotli) as respostas de texto conforme o Accept-Encoding."""
+    app.after_request(_comprimir_resposta)
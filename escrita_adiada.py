@@ -0,0 +1,282 @@
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from shards import shards
+
+
+# Desligado por padrão: cada POST /progresso grava e faz commit na hora
+ESCRITA_ADIADA = os.getenv("CODEBRINCANDO_ESCRITA_ADIADA", "0") == "1"
+ESCRITA_LOTE_MAX = int(os.getenv("CODEBRINCANDO_ESCRITA_LOTE_MAX", "500"))
+ESCRITA_INTERVALO_MS = int(os.getenv("CODEBRINCANDO_ESCRITA_INTERVALO_MS", "50"))
+ESCRITA_FILA_MAX = int(os.getenv("CODEBRINCANDO_ESCRITA_FILA_MAX", "10000"))
+ESCRITA_TENTATIVAS = 3
+
+SQL_GRAVAR_PROGRESSO = """
+    INSERT INTO progresso_usuarios (usuario_id, desafio_id, status, data_conclusao)
+    SELECT ?, ?, ?, ? FROM usuarios WHERE id = ?
+    ON CONFLICT (usuario_id, desafio_id) DO UPDATE SET
+        status = excluded.status,
+        data_conclusao = excluded.data_conclusao
+"""
+
+
+class EscritaAdiada:
+    """
+    Fila de gravações de progresso com commit em grupo (write-behind).
+
+    A rota corrige a resposta, chama `enfileirar()` e responde na hora; uma
+    thread do processo esvazia a fila e grava tudo o que chegou em uma única
+    transação, quando junta `lote_max` itens ou passam `intervalo_ms` desde o
+    primeiro da leva. Um commit (e um fsync) por lote em vez de um por requisição.
+
+    Enquanto um item não foi gravado ele fica em `pendentes_do_usuario()`, para
+    a própria API enxergar o que acabou de aceitar (leia-suas-escritas). Isso
+    vale dentro do mesmo processo; entre workers o atraso é de um intervalo.
+
+    Quem grava progresso fora da fila (fila cheia, POST /progresso/lote) usa
+    `gravando_direto()`, para um item mais antigo do mesmo par que ainda está
+    na fila não sobrescrever depois a gravação mais nova.
+    """
+
+    def __init__(self, lote_max=ESCRITA_LOTE_MAX, intervalo_ms=ESCRITA_INTERVALO_MS,
+                 fila_max=ESCRITA_FILA_MAX):
+        self.lote_max = lote_max
+        self.intervalo = intervalo_ms / 1000
+        self._fila = queue.Queue(maxsize=fila_max)
+        self._lock = threading.Lock()
+        # Segurado pela thread durante a gravação de um lote e por gravando_direto()
+        self._gravando = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._encerrando = threading.Event()
+        self._sequencia = 0
+        # usuario_id -> {desafio_id: (sequencia, status)}
+        self._pendentes = defaultdict(dict)
+        # (usuario_id, desafio_id) -> sequencia: itens do par até essa
+        # sequencia foram substituídos por uma gravação direta e são pulados
+        self._substituidas = {}
+        # Itens cujo lote falhou: voltam no começo do próximo lote
+        self._repetir = []
+        self.contadores = {
+            "enfileiradas": 0,
+            "gravadas": 0,
+            "lotes": 0,
+            "maior_lote": 0,
+            "fila_cheia": 0,
+            "substituidas": 0,
+            "ignoradas": 0,
+            "erros": 0,
+            "perdidas": 0,
+        }
+
+    def _iniciar_thread(self):
+        # Depois de um fork a thread do processo pai não existe no filho
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._executar, name="escrita-adiada", daemon=True)
+        self._thread.start()
+
+    def enfileirar(self, usuario_id, desafio_id, status, data_conclusao):
+        """
+        Aceita uma gravação. Devolve False se a fila estiver cheia; nesse caso
+        quem chamou deve gravar direto (a memória da fila é limitada).
+        """
+        with self._lock:
+            if self._encerrando.is_set():
+                return False
+            self._iniciar_thread()
+            self._sequencia += 1
+            item = (self._sequencia, usuario_id, desafio_id, status, data_conclusao)
+            try:
+                self._fila.put_nowait(item)
+            except queue.Full:
+                self.contadores["fila_cheia"] += 1
+                return False
+            self._pendentes[usuario_id][desafio_id] = (self._sequencia, status)
+            self.contadores["enfileiradas"] += 1
+        return True
+
+    def pendentes_do_usuario(self, usuario_id):
+        """{desafio_id: status} ainda não gravados deste usuário."""
+        with self._lock:
+            pendentes = self._pendentes.get(usuario_id)
+            if not pendentes:
+                return {}
+            return {desafio_id: status for desafio_id, (_, status) in pendentes.items()}
+
+    @contextmanager
+    def gravando_direto(self, pares):
+        """
+        Envolve uma gravação direta de progresso para os pares
+        (usuario_id, desafio_id). Enquanto o bloco roda a thread não grava
+        nenhum lote; se o bloco terminar sem erro, os itens desses pares que
+        ainda estão na fila são descartados, porque a gravação direta é mais nova.
+        """
+        if not self._sequencia:
+            # Nada foi enfileirado neste processo: não há o que ordenar
+            yield
+            return
+
+        with self._gravando:
+            yield
+            with self._lock:
+                for usuario_id, desafio_id in pares:
+                    pendentes = self._pendentes.get(usuario_id)
+                    if not pendentes or desafio_id not in pendentes:
+                        continue
+                    # Pares fora do overlay não têm nada esperando na fila
+                    sequencia, _ = pendentes.pop(desafio_id)
+                    if not pendentes:
+                        del self._pendentes[usuario_id]
+                    self._substituidas[(usuario_id, desafio_id)] = sequencia
+
+    def _proximo_lote(self):
+        lote, self._repetir = self._repetir, []
+        if not lote:
+            try:
+                lote.append(self._fila.get(timeout=self.intervalo))
+            except queue.Empty:
+                return []
+
+        limite = time.monotonic() + self.intervalo
+        while len(lote) < self.lote_max:
+            restante = limite - time.monotonic()
+            if restante <= 0 or self._encerrando.is_set():
+                # No encerramento não esperamos: pega só o que já está na fila
+                try:
+                    lote.append(self._fila.get_nowait())
+                    continue
+                except queue.Empty:
+                    break
+            try:
+                lote.append(self._fila.get(timeout=restante))
+            except queue.Empty:
+                break
+        return lote
+
+    def _gravar(self, lote):
+        """
+        Grava o lote, uma transação por shard. Devolve (linhas gravadas, itens
+        que falharam); itens de usuários já removidos não contam como gravados.
+        """
+        por_shard = defaultdict(list)
+        for item in lote:
+            por_shard[shards.indice(item[1])].append(item)
+        gravadas = 0
+        falhas = []
+        for indice, itens in por_shard.items():
+            linhas = [
+                (usuario_id, desafio_id, status, data_conclusao, usuario_id)
+                for _, usuario_id, desafio_id, status, data_conclusao in itens
+            ]
+            alteradas = self._gravar_no_shard(shards.pools[indice], linhas)
+            if alteradas is None:
+                falhas.extend(itens)
+            else:
+                gravadas += alteradas
+        return gravadas, falhas
+
+    def _gravar_no_shard(self, pool_shard, linhas):
+        """Linhas alteradas no shard, ou None se todas as tentativas falharem."""
+        for tentativa in range(1, ESCRITA_TENTATIVAS + 1):
+            conn = pool_shard.obter()
+            try:
+                with conn:
+                    cursor = conn.executemany(SQL_GRAVAR_PROGRESSO, linhas)
+                # O INSERT ... SELECT FROM usuarios não grava nada para usuário removido
+                return cursor.rowcount
+            except sqlite3.Error as e:
+                print(f"Erro ao gravar lote de {len(linhas)} progressos (tentativa {tentativa}): {e}")
+                time.sleep(self.intervalo * tentativa)
+            finally:
+                pool_shard.devolver(conn)
+        return None
+
+    def _executar(self):
+        while True:
+            lote = self._proximo_lote()
+            if not lote:
+                if self._encerrando.is_set():
+                    return
+                continue
+
+            with self._gravando:
+                self._gravar_lote(lote)
+
+    def _gravar_lote(self, lote):
+        with self._lock:
+            ultima = max(item[0] for item in lote)
+            validos = [
+                item for item in lote
+                if item[0] > self._substituidas.get((item[1], item[2]), 0)
+            ]
+            self.contadores["substituidas"] += len(lote) - len(validos)
+            # A fila é FIFO: nada mais antigo que o lote continua nela
+            for par in [par for par, sequencia in self._substituidas.items() if sequencia <= ultima]:
+                del self._substituidas[par]
+        lote = validos
+        if not lote:
+            return
+
+        gravadas, falhas = self._gravar(lote)
+        ignoradas = len(lote) - len(falhas) - gravadas
+        perdidas = 0
+
+        if falhas and self._encerrando.is_set():
+            # Sem próxima tentativa: ao menos fica registrado o que se perdeu
+            for _, usuario_id, desafio_id, status, _ in falhas:
+                print(f"Progresso perdido no encerramento: usuario_id={usuario_id} "
+                      f"desafio_id={desafio_id} status={status}")
+            perdidas = len(falhas)
+            falhas = []
+        else:
+            # Continuam no overlay e voltam no próximo lote, na mesma ordem
+            self._repetir = falhas
+
+        with self._lock:
+            # Sai do overlay só se não chegou uma escrita mais nova para o par
+            repetir = {item[0] for item in falhas}
+            for sequencia, usuario_id, desafio_id, _, _ in lote:
+                if sequencia in repetir:
+                    continue
+                pendentes = self._pendentes.get(usuario_id)
+                if pendentes and pendentes.get(desafio_id, (None,))[0] == sequencia:
+                    del pendentes[desafio_id]
+                    if not pendentes:
+                        del self._pendentes[usuario_id]
+            if gravadas:
+                self.contadores["gravadas"] += gravadas
+                self.contadores["lotes"] += 1
+                self.contadores["maior_lote"] = max(self.contadores["maior_lote"], len(lote))
+            self.contadores["ignoradas"] += ignoradas
+            self.contadores["erros"] += len(falhas)
+            self.contadores["perdidas"] += perdidas
+
+    def encerrar(self, timeout=30):
+        """Grava o que falta e para a thread (no fim do processo)."""
+        with self._lock:
+            self._encerrando.set()
+            thread = self._thread if self._pid == os.getpid() else None
+        if thread is not None and thread.is_alive():
+            thread.join(timeout)
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "habilitada": ESCRITA_ADIADA,
+                "na_fila": self._fila.qsize(),
+                "lote_max": self.lote_max,
+                "intervalo_ms": int(self.intervalo * 1000),
+                **self.contadores,
+            }
+
+
+escrita_adiada = EscritaAdiada()
+atexit.register(escrita_adiada.encerrar)
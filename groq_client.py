@@ -0,0 +1,378 @@
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# Pode apontar para um servidor local (stub) em testes e benchmarks
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
+
+GROQ_TIMEOUT_CONEXAO = float(os.getenv("GROQ_TIMEOUT_CONEXAO", "3.05"))
+GROQ_TIMEOUT_LEITURA = float(os.getenv("GROQ_TIMEOUT_LEITURA", "20"))
+GROQ_TENTATIVAS = int(os.getenv("GROQ_TENTATIVAS", "3"))
+GROQ_BACKOFF_BASE = float(os.getenv("GROQ_BACKOFF_BASE", "0.5"))
+GROQ_BACKOFF_MAX = float(os.getenv("GROQ_BACKOFF_MAX", "8"))
+GROQ_POOL_MAX = int(os.getenv("GROQ_POOL_MAX", "10"))
+
+# Limites de chamadas simultâneas à Groq e da fila de espera por uma vaga
+ROBOTECA_MAX_SIMULTANEAS = int(os.getenv("ROBOTECA_MAX_SIMULTANEAS", "8"))
+ROBOTECA_MAX_FILA = int(os.getenv("ROBOTECA_MAX_FILA", "32"))
+ROBOTECA_ESPERA_MAX = float(os.getenv("ROBOTECA_ESPERA_MAX", "5"))
+
+# Respostas que valem uma nova tentativa
+STATUS_RETENTAVEIS = frozenset({429, 500, 502, 503, 504})
+
+# Quantas latências recentes guardamos para calcular percentis
+JANELA_LATENCIAS = 1000
+
+
+class ErroGroq(Exception):
+    def __init__(self, mensagem, status_code=None, corpo=None):
+        super().__init__(mensagem)
+        self.status_code = status_code
+        self.corpo = corpo
+
+
+class SobrecargaGroq(Exception):
+    """Fila de chamadas à Groq cheia ou espera por vaga estourada."""
+
+
+def _percentis_ms(valores):
+    if not valores:
+        return None
+    valores = sorted(valores)
+
+    def percentil(p):
+        return round(valores[min(len(valores) - 1, int(p * len(valores)))] * 1000, 1)
+
+    return {
+        "p50": percentil(0.50),
+        "p95": percentil(0.95),
+        "p99": percentil(0.99),
+        "max": round(valores[-1] * 1000, 1),
+    }
+
+
+def _segundos_retry_after(valor):
+    """Retry-After pode vir em segundos ou como data HTTP."""
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(valor).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class ClienteGroq:
+    """
+    Cliente HTTP da Groq com conexões reaproveitadas (keep-alive).
+
+    Usa uma `requests.Session` com pool limitado, timeouts separados de
+    conexão e leitura e novas tentativas com backoff exponencial com jitter,
+    respeitando o cabeçalho Retry-After em respostas 429/503.
+    """
+
+    def __init__(self, base_url=GROQ_BASE_URL, api_key=None,
+                 timeout_conexao=GROQ_TIMEOUT_CONEXAO, timeout_leitura=GROQ_TIMEOUT_LEITURA,
+                 tentativas=GROQ_TENTATIVAS, backoff_base=GROQ_BACKOFF_BASE,
+                 backoff_max=GROQ_BACKOFF_MAX, pool_max=GROQ_POOL_MAX):
+        self.base_url = base_url.rstrip("/")
+        self._api_key = api_key
+        self.timeout = (timeout_conexao, timeout_leitura)
+        self.tentativas = max(1, tentativas)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.sessao = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=pool_max, pool_block=True)
+        self.sessao.mount("https://", adaptador)
+        self.sessao.mount("http://", adaptador)
+
+        self._lock = threading.Lock()
+        self._latencias = deque(maxlen=JANELA_LATENCIAS)
+        self.contadores = {
+            "chamadas": 0,
+            "sucessos": 0,
+            "falhas": 0,
+            "novas_tentativas": 0,
+        }
+        self.respostas_por_status = {}
+        # Funções chamadas com (status_code, duracao, sucesso) a cada chamada
+        self.ouvintes = []
+
+    @property
+    def api_key(self):
+        return self._api_key or os.getenv("GROQ_API_KEY")
+
+    def _cabecalhos(self):
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+    def _espera(self, tentativa, retry_after=None):
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        # "Full jitter": sorteia entre 0 e o teto exponencial
+        teto = min(self.backoff_max, self.backoff_base * (2 ** tentativa))
+        return random.uniform(0, teto)
+
+    def _registrar(self, status_code, duracao, sucesso):
+        with self._lock:
+            self.contadores["chamadas"] += 1
+            self.contadores["sucessos" if sucesso else "falhas"] += 1
+            chave = str(status_code) if status_code is not None else "erro_conexao"
+            self.respostas_por_status[chave] = self.respostas_por_status.get(chave, 0) + 1
+            self._latencias.append(duracao)
+        for ouvinte in self.ouvintes:
+            ouvinte(status_code, duracao, sucesso)
+
+    def post(self, caminho, payload, **kwargs):
+        """
+        POST com novas tentativas. Devolve a `requests.Response` de sucesso
+        ou levanta ErroGroq. `kwargs` vai direto para `Session.post`
+        (por exemplo `stream=True`).
+        """
+        url = f"{self.base_url}{caminho}"
+        inicio = time.perf_counter()
+        ultimo_erro = None
+
+        for tentativa in range(self.tentativas):
+            if tentativa:
+                with self._lock:
+                    self.contadores["novas_tentativas"] += 1
+
+            try:
+                resposta = self.sessao.post(
+                    url, json=payload, headers=self._cabecalhos(), timeout=self.timeout, **kwargs
+                )
+            except requests.exceptions.ConnectionError as e:
+                # Inclui ConnectTimeout. ReadTimeout não é repetido: a Groq já
+                # pode estar gerando e repetir só dobraria a espera da criança.
+                ultimo_erro = ErroGroq(f"Falha de conexão com a Groq: {e}")
+                if tentativa + 1 < self.tentativas:
+                    time.sleep(self._espera(tentativa))
+                continue
+            except requests.exceptions.RequestException as e:
+                self._registrar(None, time.perf_counter() - inicio, False)
+                raise ErroGroq(f"Erro na chamada à Groq: {e}") from e
+
+            if resposta.status_code == 200:
+                self._registrar(200, time.perf_counter() - inicio, True)
+                return resposta
+
+            ultimo_erro = ErroGroq(
+                f"Groq respondeu {resposta.status_code}",
+                status_code=resposta.status_code,
+                corpo=resposta.text
+            )
+            if resposta.status_code not in STATUS_RETENTAVEIS:
+                break
+            if tentativa + 1 < self.tentativas:
+                retry_after = _segundos_retry_after(resposta.headers.get("Retry-After"))
+                resposta.close()
+                time.sleep(self._espera(tentativa, retry_after))
+
+        self._registrar(ultimo_erro.status_code, time.perf_counter() - inicio, False)
+        raise ultimo_erro
+
+    def completar(self, mensagens, modelo, temperatura):
+        """Chama /chat/completions e devolve só o texto da resposta."""
+        resposta = self.post("/chat/completions", {
+            "model": modelo,
+            "messages": mensagens,
+            "temperature": temperatura
+        })
+        data = resposta.json()
+        return data["choices"][0]["message"]["content"]
+
+    def completar_em_partes(self, mensagens, modelo, temperatura):
+        """
+        Versão com `stream: true`. A requisição (e as novas tentativas) é feita
+        aqui mesmo, então erros da Groq aparecem antes do primeiro byte; o que
+        volta é um gerador com os pedaços de texto, na ordem em que chegam.
+        """
+        resposta = self.post("/chat/completions", {
+            "model": modelo,
+            "messages": mensagens,
+            "temperature": temperatura,
+            "stream": True
+        }, stream=True)
+        resposta.encoding = "utf-8"
+
+        def partes():
+            try:
+                for linha in resposta.iter_lines(chunk_size=None, decode_unicode=True):
+                    if not linha or not linha.startswith("data:"):
+                        continue
+                    dados = linha[len("data:"):].strip()
+                    if dados == "[DONE]":
+                        break
+                    escolha = json.loads(dados)["choices"][0]
+                    texto = escolha.get("delta", {}).get("content")
+                    if texto:
+                        yield texto
+            finally:
+                resposta.close()
+
+        return partes()
+
+    def estatisticas(self):
+        with self._lock:
+            dados = dict(self.contadores)
+            dados["respostas_por_status"] = dict(self.respostas_por_status)
+            latencias = list(self._latencias)
+
+        dados["latencia_ms"] = _percentis_ms(latencias)
+        return dados
+
+
+class _Voo:
+    """Uma chamada em andamento que outras requisições iguais podem esperar."""
+
+    def __init__(self):
+        self.pronto = threading.Event()
+        self.resultado = None
+        self.erro = None
+
+
+class ControleConcorrencia:
+    """
+    Controla as chamadas à Groq que saem do processo.
+
+    - Coalescência (single-flight): pedidos com a mesma chave ao mesmo tempo
+      esperam a chamada que já está em andamento em vez de abrir outra.
+    - Limite de chamadas simultâneas, com uma fila de espera limitada. Quando a
+      fila está cheia, ou a espera passa de `espera_max`, levanta
+      SobrecargaGroq na hora, para a rota devolver um 503. Os pedidos
+      coalescidos esperando o líder também contam na fila.
+    """
+
+    def __init__(self, max_simultaneas=ROBOTECA_MAX_SIMULTANEAS, max_fila=ROBOTECA_MAX_FILA,
+                 espera_max=ROBOTECA_ESPERA_MAX):
+        self.max_simultaneas = max_simultaneas
+        self.max_fila = max_fila
+        self.espera_max = espera_max
+
+        self._vagas = threading.BoundedSemaphore(max_simultaneas)
+        self._lock = threading.Lock()
+        self._voos = {}
+        self._em_andamento = 0
+        self._na_fila = 0
+        self._esperas = deque(maxlen=JANELA_LATENCIAS)
+        self.contadores = {
+            "executadas": 0,
+            "coalescidas": 0,
+            "rejeitadas": 0,
+        }
+
+    def reservar_vaga(self):
+        """
+        Espera uma vaga e devolve a função que a libera (pode ser chamada
+        mais de uma vez). Levanta SobrecargaGroq se não houver vaga.
+        """
+        inicio = time.perf_counter()
+        conseguiu = self._vagas.acquire(blocking=False)
+
+        if not conseguiu:
+            with self._lock:
+                if self._na_fila >= self.max_fila:
+                    self.contadores["rejeitadas"] += 1
+                    raise SobrecargaGroq("Fila de chamadas à Groq cheia")
+                self._na_fila += 1
+            try:
+                conseguiu = self._vagas.acquire(timeout=self.espera_max)
+            finally:
+                with self._lock:
+                    self._na_fila -= 1
+            if not conseguiu:
+                with self._lock:
+                    self.contadores["rejeitadas"] += 1
+                raise SobrecargaGroq("Tempo de espera por uma vaga na Groq esgotado")
+
+        with self._lock:
+            self._em_andamento += 1
+            self.contadores["executadas"] += 1
+            self._esperas.append(time.perf_counter() - inicio)
+
+        liberada = threading.Event()
+
+        def liberar():
+            with self._lock:
+                if liberada.is_set():
+                    return
+                liberada.set()
+                self._em_andamento -= 1
+            self._vagas.release()
+
+        return liberar
+
+    def executar(self, chave, funcao):
+        """Executa `funcao()` uma vez por chave entre pedidos simultâneos."""
+        with self._lock:
+            voo = self._voos.get(chave)
+            lider = voo is None
+            if lider:
+                voo = _Voo()
+                self._voos[chave] = voo
+            else:
+                # Quem espera o líder também ocupa uma thread: conta na fila
+                if self._na_fila >= self.max_fila:
+                    self.contadores["rejeitadas"] += 1
+                    raise SobrecargaGroq("Fila de chamadas à Groq cheia")
+                self._na_fila += 1
+                self.contadores["coalescidas"] += 1
+
+        if not lider:
+            try:
+                voo.pronto.wait()
+            finally:
+                with self._lock:
+                    self._na_fila -= 1
+            if voo.erro is not None:
+                raise voo.erro
+            return voo.resultado
+
+        try:
+            liberar = self.reservar_vaga()
+            try:
+                voo.resultado = funcao()
+            finally:
+                liberar()
+            return voo.resultado
+        except Exception as e:
+            voo.erro = e
+            raise
+        finally:
+            with self._lock:
+                del self._voos[chave]
+            voo.pronto.set()
+
+    def estatisticas(self):
+        with self._lock:
+            dados = dict(self.contadores)
+            dados.update({
+                "max_simultaneas": self.max_simultaneas,
+                "max_fila": self.max_fila,
+                "em_andamento": self._em_andamento,
+                "na_fila": self._na_fila,
+                "coalescendo": len(self._voos),
+            })
+            esperas = list(self._esperas)
+
+        dados["espera_ms"] = _percentis_ms(esperas)
+        return dados
+
+
+cliente_groq = ClienteGroq()
+controle_groq = ControleConcorrencia()
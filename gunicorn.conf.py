@@ -0,0 +1,84 @@
+# Configuração do gunicorn para produção:
+#   gunicorn -c gunicorn.conf.py
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+
+wsgi_app = "wsgi:app"
+bind = os.getenv("BIND", "0.0.0.0:5001")
+
+# Processos e threads por processo (gthread: cada worker atende várias
+# requisições ao mesmo tempo, bom para quem espera a Groq ou o SQLite)
+workers = int(os.getenv("WEB_CONCURRENCY", str(min(multiprocessing.cpu_count() * 2 + 1, 9))))
+threads = int(os.getenv("GUNICORN_THREADS", "16"))
+worker_class = "gthread"
+
+# /ajuda-bot pode levar 20 s de leitura mais as novas tentativas
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "90"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+# O app NÃO é carregado no processo mestre: cada worker abre o seu próprio
+# pool de conexões SQLite e a sua sessão HTTP com a Groq depois do fork.
+preload_app = False
+
+# Reserva de threads para as rotas rápidas: no máximo metade das threads de
+# cada worker fica com a RoboTeca (um quarto chamando a Groq e um quarto na
+# fila, contando os pedidos coalescidos que esperam uma chamada igual). O
+# resto continua livre para as rotas de SQLite.
+os.environ.setdefault("ROBOTECA_MAX_SIMULTANEAS", str(max(1, threads // 4)))
+os.environ.setdefault("ROBOTECA_MAX_FILA", str(max(1, threads // 4)))
+
+# Métricas do Prometheus somadas entre os workers (precisa existir antes de
+# qualquer import do prometheus_client, por isso fica aqui em cima)
+os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "codebrincando_metricas")
+)
+
+accesslog = "-"
+errorlog = "-"
+
+
+def on_starting(server):
+    # Roda uma única vez, no processo mestre, antes de qualquer worker nascer
+    from app import init_db
+    from banco import pool
+    from shards import shards
+
+    init_db()
+    # Conexões SQLite não podem atravessar o fork
+    pool.fechar_todas()
+    shards.fechar_todas()
+
+    # Limpa as métricas só agora: o import acima já criou arquivos com o pid
+    # do mestre, que não atende requisições e só puxaria os gauges para zero
+    pasta_metricas = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(pasta_metricas, ignore_errors=True)
+    os.makedirs(pasta_metricas, exist_ok=True)
+
+
+def post_worker_init(worker):
+    # A cópia de leitura e o índice da RoboTeca já nascem prontos, antes da
+    # primeira requisição
+    from indice_roboteca import ROBOTECA_INDICE, indice_roboteca
+    from snapshot_leitura import SNAPSHOT_LEITURA, snapshot_leitura
+
+    if SNAPSHOT_LEITURA:
+        snapshot_leitura.iniciar()
+    if ROBOTECA_INDICE:
+        indice_roboteca.carregar()
+
+
+def worker_exit(server, worker):
+    # Grava o que ainda estiver na fila da escrita adiada antes do worker sair
+    from escrita_adiada import escrita_adiada
+
+    escrita_adiada.encerrar()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
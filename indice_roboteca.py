@@ -0,0 +1,290 @@
+import html
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from banco import pool
+from cache_roboteca import chave_contexto, normalizar_pergunta
+from catalogo import catalogo
+
+
+# Ligado por padrão: dúvidas que o conteúdo já responde não vão para a Groq
+ROBOTECA_INDICE = os.getenv("ROBOTECA_INDICE", "1") == "1"
+# Fração (pesada pelo IDF) das palavras da dúvida que o documento precisa ter
+ROBOTECA_INDICE_LIMIAR = float(os.getenv("ROBOTECA_INDICE_LIMIAR", "0.8"))
+# Dúvidas com menos palavras que isso (fora as vazias) só casam com o título de
+# uma explicação ou desafio: uma palavra só ("tag?") teria confiança 1.0 em
+# qualquer documento que a tenha no texto
+ROBOTECA_INDICE_TERMOS_MIN = int(os.getenv("ROBOTECA_INDICE_TERMOS_MIN", "2"))
+# Respostas da Groq guardadas no índice (as mais recentes)
+ROBOTECA_INDICE_RESPOSTAS_MAX = int(os.getenv("ROBOTECA_INDICE_RESPOSTAS_MAX", "5000"))
+
+# Parâmetros do BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Palavras que aparecem em quase toda dúvida e não dizem nada sobre o assunto
+PALAVRAS_VAZIAS = frozenset("""
+    a o as os um uma uns umas de do da dos das no na nos nas em ao aos pra pro
+    para por pelo pela com sem e ou que se eu voce ele ela nao sim mas como
+    porque pq qual quais quando onde ser esta estou tem ter fica ficou isso
+    esse essa este aquilo meu minha seu sua me mim te entendi entender
+    sei saber consigo fazer faz eh oi ola sao significa significado quer dizer
+    serve servem
+""".split())
+
+_PALAVRAS = re.compile(r"[a-z0-9]+")
+_QUEBRAS = re.compile(r"<br\s*/?>", re.IGNORECASE)
+_MARCADOR_DESAFIO = re.compile(r"\bDESAFIO\b")
+
+
+def radical(palavra):
+    """Tira o plural: tags -> tag, cores -> cor, botoes -> botao."""
+    if len(palavra) <= 3:
+        return palavra
+    if palavra.endswith("oes"):
+        return palavra[:-3] + "ao"
+    if palavra.endswith("es") and palavra[-3] in "rzs":
+        return palavra[:-2]
+    if palavra.endswith("s"):
+        return palavra[:-1]
+    return palavra
+
+
+def extrair_termos(texto):
+    """Palavras normalizadas (sem acento, minúsculas, sem plural e sem palavras vazias)."""
+    return [
+        radical(palavra)
+        for palavra in _PALAVRAS.findall(normalizar_pergunta(texto))
+        if palavra not in PALAVRAS_VAZIAS
+    ]
+
+
+def texto_da_instrucao(instrucao):
+    """
+    Parte explicativa da instrução de um desafio, em texto puro: sem os
+    <br>, com as entidades (&lt;h1&gt;) convertidas e sem o enunciado que
+    vem depois de "DESAFIO".
+    """
+    texto = html.unescape(_QUEBRAS.sub(" ", instrucao or ""))
+    texto = _MARCADOR_DESAFIO.split(texto, maxsplit=1)[0]
+    return " ".join(texto.split())
+
+
+class Documento:
+    __slots__ = ("chave", "resposta", "termos", "tamanho", "contexto", "assunto")
+
+    def __init__(self, chave, resposta, termos, contexto=None, assunto=()):
+        self.chave = chave
+        self.resposta = resposta
+        self.termos = Counter(termos)
+        self.tamanho = len(termos)
+        # Só respostas da Groq têm contexto (chave_contexto); o catálogo vale para todos
+        self.contexto = contexto
+        # Palavras do título: as únicas que respondem uma dúvida curta
+        self.assunto = frozenset(assunto)
+
+
+class IndiceRoboTeca:
+    """
+    Índice invertido (BM25) das respostas que a RoboTeca já conhece.
+
+    Entram as explicações e a parte explicativa das instruções dos desafios
+    (vindas do catálogo em memória) e as dúvidas já respondidas pela Groq
+    (tabela `respostas_roboteca`). Uma dúvida nova é comparada só pelas
+    palavras: o documento com maior BM25 responde se tiver pelo menos
+    `limiar` das palavras da dúvida, pesadas pelo IDF (palavra rara conta mais).
+    Uma resposta da Groq só vale para dúvidas feitas no mesmo contexto
+    (o mesmo desafio), e dúvidas com menos de `termos_min` palavras só casam
+    com o título de uma explicação ou desafio.
+
+    Montado na subida do worker; respostas novas da Groq entram na hora e
+    o catálogo é reindexado quando muda. Respostas gravadas por outros
+    workers só entram na próxima subida.
+    """
+
+    def __init__(self, limiar=ROBOTECA_INDICE_LIMIAR, respostas_max=ROBOTECA_INDICE_RESPOSTAS_MAX,
+                 termos_min=ROBOTECA_INDICE_TERMOS_MIN):
+        self.limiar = limiar
+        self.termos_min = termos_min
+        self.respostas_max = respostas_max
+        self._lock = threading.Lock()
+        self._carregando = threading.Lock()
+        self._carregado = False
+        self._catalogo = None
+        # termo -> {chave do documento: frequência}
+        self._postings = {}
+        self._documentos = {}
+        self._tamanho_total = 0
+        # Chaves das respostas da Groq, da mais antiga para a mais nova
+        self._respostas = OrderedDict()
+        self.contadores = {"consultas": 0, "acertos": 0, "faltas": 0}
+
+        # Funções chamadas com (acertou, duracao) a cada consulta (ver metricas.py)
+        self.ouvintes = []
+
+    # --- MONTAGEM ---
+    def carregar(self):
+        """Indexa o catálogo e as respostas já guardadas no banco (uma vez)."""
+        with self._carregando:
+            if self._carregado:
+                return
+            conn = pool.obter()
+            try:
+                linhas = conn.execute(
+                    """
+                    SELECT chave, pergunta, resposta, contexto FROM respostas_roboteca
+                    WHERE pergunta IS NOT NULL AND contexto IS NOT NULL
+                    ORDER BY acessado_em DESC
+                    LIMIT ?
+                    """,
+                    (self.respostas_max,)
+                ).fetchall()
+            finally:
+                pool.devolver(conn)
+
+            with self._lock:
+                self._indexar_catalogo(catalogo.obter())
+                # Da mais antiga para a mais nova, para o limite descartar as antigas primeiro
+                for chave, pergunta, resposta, contexto in reversed(linhas):
+                    self._adicionar_resposta(chave, pergunta, resposta, contexto)
+                self._carregado = True
+
+    def adicionar_resposta(self, chave, pergunta, resposta, contexto=""):
+        """Uma resposta nova da Groq passa a responder a mesma dúvida (no mesmo contexto) sem a Groq."""
+        with self._lock:
+            if self._carregado:
+                self._adicionar_resposta(chave, pergunta, resposta, chave_contexto(contexto))
+
+    def _adicionar_resposta(self, chave, pergunta, resposta, contexto):
+        chave = ("resposta", chave)
+        self._respostas.pop(chave, None)
+        self._respostas[chave] = True
+        self._adicionar(Documento(chave, resposta, extrair_termos(pergunta), contexto))
+        while len(self._respostas) > self.respostas_max:
+            antiga, _ = self._respostas.popitem(last=False)
+            self._remover(antiga)
+
+    def _indexar_catalogo(self, cat):
+        for chave in [chave for chave in self._documentos if chave[0] != "resposta"]:
+            self._remover(chave)
+
+        for explicacao in cat.explicacoes:
+            resposta = f"{explicacao['titulo']}\n\n{explicacao['texto']}"
+            if explicacao["codigo"]:
+                resposta += f"\n\nExemplo:\n{explicacao['codigo']}"
+            # O título vale em dobro: é o assunto da explicação
+            titulo = extrair_termos(explicacao["titulo"])
+            termos = titulo * 2 + extrair_termos(explicacao["texto"])
+            self._adicionar(Documento(("explicacao", explicacao["id"]), resposta, termos, assunto=titulo))
+
+        for desafio in cat.desafios_ordenados:
+            texto = texto_da_instrucao(desafio["instrucao"])
+            if texto:
+                nome = extrair_termos(desafio["nome"])
+                termos = nome * 2 + extrair_termos(texto)
+                self._adicionar(Documento(("desafio", desafio["id"]), texto, termos, assunto=nome))
+
+        self._catalogo = cat
+
+    def _adicionar(self, documento):
+        if documento.chave in self._documentos:
+            self._remover(documento.chave)
+        if not documento.tamanho:
+            return
+        self._documentos[documento.chave] = documento
+        self._tamanho_total += documento.tamanho
+        for termo, frequencia in documento.termos.items():
+            self._postings.setdefault(termo, {})[documento.chave] = frequencia
+
+    def _remover(self, chave):
+        documento = self._documentos.pop(chave, None)
+        if documento is None:
+            return
+        self._tamanho_total -= documento.tamanho
+        for termo in documento.termos:
+            postings = self._postings[termo]
+            del postings[chave]
+            if not postings:
+                del self._postings[termo]
+
+    # --- CONSULTA ---
+    def buscar(self, duvida, contexto=""):
+        """
+        Melhor resposta para a dúvida, ou None se nenhuma passa do limiar.
+        Respostas da Groq dadas em outro contexto não contam.
+        Devolve (resposta, confianca, chave do documento).
+        """
+        inicio = time.perf_counter()
+        if not self._carregado:
+            self.carregar()
+
+        cat = catalogo.obter()
+        with self._lock:
+            if cat is not self._catalogo:
+                self._indexar_catalogo(cat)
+            encontrado = self._melhor(set(extrair_termos(duvida)), chave_contexto(contexto))
+
+        acertou = encontrado is not None
+        with self._lock:
+            self.contadores["consultas"] += 1
+            self.contadores["acertos" if acertou else "faltas"] += 1
+        duracao = time.perf_counter() - inicio
+        for ouvinte in self.ouvintes:
+            ouvinte(acertou, duracao)
+        return encontrado
+
+    def _melhor(self, termos, contexto):
+        total_documentos = len(self._documentos)
+        if not termos or not total_documentos:
+            return None
+        curta = len(termos) < self.termos_min
+
+        tamanho_medio = self._tamanho_total / total_documentos
+        idfs = {}
+        pontuacao = Counter()
+        cobertura = Counter()
+        for termo in termos:
+            postings = self._postings.get(termo, {})
+            frequencia_documentos = len(postings)
+            idf = math.log(1 + (total_documentos - frequencia_documentos + 0.5) / (frequencia_documentos + 0.5))
+            idfs[termo] = idf
+            for chave, frequencia in postings.items():
+                documento = self._documentos[chave]
+                if documento.contexto is not None and documento.contexto != contexto:
+                    continue
+                if curta and not termos <= documento.assunto:
+                    continue
+                tamanho = documento.tamanho
+                pontuacao[chave] += idf * frequencia * (BM25_K1 + 1) / (
+                    frequencia + BM25_K1 * (1 - BM25_B + BM25_B * tamanho / tamanho_medio)
+                )
+                cobertura[chave] += idf
+
+        if not pontuacao:
+            return None
+
+        peso_total = sum(idfs.values())
+        chave = max(pontuacao, key=lambda chave: (cobertura[chave], pontuacao[chave]))
+        confianca = cobertura[chave] / peso_total
+        if confianca < self.limiar:
+            return None
+        return self._documentos[chave].resposta, round(confianca, 3), chave
+
+    def estatisticas(self):
+        with self._lock:
+            dados = dict(self.contadores)
+            dados["habilitado"] = ROBOTECA_INDICE
+            dados["limiar"] = self.limiar
+            dados["termos_min"] = self.termos_min
+            dados["documentos"] = len(self._documentos)
+            dados["respostas_groq"] = len(self._respostas)
+            dados["termos"] = len(self._postings)
+        dados["taxa_acerto"] = round(dados["acertos"] / dados["consultas"], 4) if dados["consultas"] else 0.0
+        return dados
+
+
+indice_roboteca = IndiceRoboTeca()
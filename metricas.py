@@ -0,0 +1,149 @@
+import os
+import time
+
+from flask import Response, g, has_request_context, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest,
+)
+from prometheus_client import multiprocess
+
+import banco
+from groq_client import cliente_groq
+from indice_roboteca import indice_roboteca
+from snapshot_leitura import snapshot_leitura
+
+
+# Com vários workers (gunicorn) cada processo grava os valores em arquivos
+# dentro de PROMETHEUS_MULTIPROC_DIR e o /metrics soma todos eles.
+MULTIPROCESSO = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+BUCKETS_HTTP = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BUCKETS_SQL = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5)
+
+duracao_requisicoes = Histogram(
+    "codebrincando_http_request_duration_seconds",
+    "Duração das requisições HTTP por rota, método e status",
+    ["rota", "metodo", "status"],
+    buckets=BUCKETS_HTTP,
+)
+
+consultas_sql = Counter(
+    "codebrincando_sql_queries_total",
+    "Comandos SQL executados por rota",
+    ["rota"],
+)
+
+duracao_sql = Histogram(
+    "codebrincando_sql_query_duration_seconds",
+    "Duração dos comandos SQL por rota",
+    ["rota"],
+    buckets=BUCKETS_SQL,
+)
+
+duracao_groq = Histogram(
+    "codebrincando_groq_request_duration_seconds",
+    "Duração das chamadas à Groq (com novas tentativas) por status",
+    ["status"],
+    buckets=BUCKETS_HTTP,
+)
+
+duracao_snapshot = Histogram(
+    "codebrincando_read_snapshot_refresh_duration_seconds",
+    "Tempo para copiar o banco para a cópia de leitura em memória",
+    buckets=BUCKETS_SQL + (1, 2.5, 5),
+)
+
+atraso_snapshot = Histogram(
+    "codebrincando_read_snapshot_lag_seconds",
+    "Atraso máximo da cópia de leitura no momento em que foi substituída",
+    buckets=BUCKETS_HTTP,
+)
+
+# Com vários workers fica o menor valor: o atraso é o do worker mais atrasado.
+# Atraso atual = time() - codebrincando_read_snapshot_verified_timestamp_seconds
+verificacao_snapshot = Gauge(
+    "codebrincando_read_snapshot_verified_timestamp_seconds",
+    "Último instante em que a cópia de leitura batia com o arquivo do banco",
+    multiprocess_mode="livemin",
+)
+
+
+consultas_indice = Counter(
+    "codebrincando_roboteca_index_lookups_total",
+    "Dúvidas da RoboTeca procuradas no índice local, por resultado",
+    ["resultado"],
+)
+
+duracao_indice = Histogram(
+    "codebrincando_roboteca_index_lookup_duration_seconds",
+    "Duração da busca de uma dúvida no índice local da RoboTeca",
+    buckets=BUCKETS_SQL,
+)
+
+
+def _rota_atual():
+    if has_request_context() and request.url_rule is not None:
+        return request.url_rule.rule
+    return "fora_de_requisicao"
+
+
+def _observar_sql(sql, duracao):
+    rota = _rota_atual()
+    consultas_sql.labels(rota).inc()
+    duracao_sql.labels(rota).observe(duracao)
+
+
+def _observar_groq(status_code, duracao, sucesso):
+    duracao_groq.labels(str(status_code) if status_code is not None else "erro_conexao").observe(duracao)
+
+
+def _observar_snapshot(duracao, atraso, verificado_em):
+    if duracao is not None:
+        duracao_snapshot.observe(duracao)
+        atraso_snapshot.observe(atraso)
+    verificacao_snapshot.set(verificado_em)
+
+
+def _observar_indice(acertou, duracao):
+    consultas_indice.labels("acerto" if acertou else "falta").inc()
+    duracao_indice.observe(duracao)
+
+
+def _inicio_requisicao():
+    g.inicio_requisicao = time.perf_counter()
+
+
+def _fim_requisicao(resposta):
+    inicio = g.pop("inicio_requisicao", None)
+    if inicio is not None:
+        rota = request.url_rule.rule if request.url_rule is not None else "desconhecida"
+        duracao_requisicoes.labels(rota, request.method, str(resposta.status_code)).observe(
+            time.perf_counter() - inicio
+        )
+    return resposta
+
+
+def metricas():
+    """Métricas no formato texto do Prometheus."""
+    if MULTIPROCESSO:
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+    else:
+        registro = REGISTRY
+    return Response(generate_latest(registro), headers={"Content-Type": CONTENT_TYPE_LATEST})
+
+
+def instrumentar(app):
+    """Liga as métricas de requisições, SQL, Groq e índice da RoboTeca e expõe GET /metrics."""
+    app.before_request(_inicio_requisicao)
+    app.after_request(_fim_requisicao)
+    app.add_url_rule("/metrics", "metricas", metricas, methods=["GET"])
+
+    if _observar_sql not in banco.ouvintes_sql:
+        banco.ouvintes_sql.append(_observar_sql)
+    if _observar_groq not in cliente_groq.ouvintes:
+        cliente_groq.ouvintes.append(_observar_groq)
+    if _observar_snapshot not in snapshot_leitura.ouvintes:
+        snapshot_leitura.ouvintes.append(_observar_snapshot)
+    if _observar_indice not in indice_roboteca.ouvintes:
+        indice_roboteca.ouvintes.append(_observar_indice)
@@ -0,0 +1,502 @@
+import sqlite3
+
+
+# --- CONTEÚDO INICIAL ---
+# Tuplas (nome, linguagem, instrucao, codigo_bugado, codigo_esperado)
+DESAFIOS_INICIAIS = [
+    (
+        'O Título Sumiu!',
+        'html',
+        'Para um título grandão, usamos a tag &lt;h1&gt;. Toda tag que é aberta precisa ser fechada com uma barra, assim: &lt;/h1&gt;. <br><br> DESAFIO <br> Nosso mascote queria escrever um título grande com a frase "Olá, Mundo!", o código dele foi: <br><br> &lt;titul0&gt;Olá, Mundo!&lt;/titul0&gt;  <br><br> O código do nosso mascote não está aparecendo, você consegue nos ajudar?',
+        '<titul0>Olá, Mundo!</titul0>',
+        '<h1>Olá, Mundo!</h1>'
+    ),
+    (
+        'Parágrafo Tímido',
+        'html',
+        'A tag de parágrafo é a &lt;p&gt; e também precisa ser aberta e fechada para funcionar! <br><br> DESAFIO <br> O parágrafo do nosso mascote não foi fechado e ficou assim: <br><br> &lt;p&gt;Meu animal favorito é o golfinho!. <br><br> Você consegue nos ajudar?',
+        '<p>Meu animal favorito é o golfinho!',
+        '<p>Meu animal favorito é o golfinho!</p>'
+    ),
+    (
+        'O Site não Pinta!',
+        'css',
+        'Para mudar a cor de fundo, a ordem que devemos dar ao computador é "background-color".<br> Se usarmos só "color", ele pinta o texto!<br><br> DESAFIO <br> O código do nosso mascote foi:<br><br>body { color: lightblue; } <br><br> O resultado desse codigo foi texto ficar azul. <br> Você consegue nos ajudar de novo e escrever um código que pinte apenas o fundo (background) de azul?',
+        'body { color: lightblue; }',
+        'body { background-color: lightblue; }'
+    )
+]
+
+
+# Tuplas (tipo, titulo, texto, codigo)
+EXPLICACOES_INICIAIS = [
+    (
+        'intro',
+        "Ei, você, você mesmo!!",
+        "Vamos aprender um pouco de Engenharia de Software?\nJuro que é muito mais simples do que parece!\n\nTeremos 5 conceitos para começar...",
+        None
+    ),
+    (
+        'conceito',
+        "1. O que é um site?",
+        "Um site é como uma casinha que vive dentro do computador! Quando você entra em um site, é como visitar essa casa. Ela pode ter portas (links), quadros na parede (imagens), recados colados na geladeira (textos) e até botões que fazem coisas acontecerem (tipo uma campainha que toca)!",
+        None
+    ),
+    (
+        'conceito',
+        "2. O que é HTML? (a estrutura)",
+        "O HTML é como o esqueleto da casa. Ele diz onde vai o título, a imagem, o botão, a lista… É tipo montar uma lancheira com divisórias: um espaço pro sanduíche, outro pro suco, outro pra sobremesa.",
+        '<h1>Olá, mundo!</h1>\n<p>Este é o meu primeiro site!</p>'
+    ),
+    (
+        'conceito',
+        "3. O que é CSS? (o visual)",
+        "CSS é o que deixa o site bonito! Ele pinta as paredes, escolhe a fonte do texto, muda o tamanho das coisas e até coloca brilhos e animações. É como colocar roupas e maquiagem no seu personagem!",
+        'p {\n  color: blue;\n  font-size: 20px;\n}'
+    ),
+    (
+        'conceito',
+        "4. O que é JavaScript? (o cérebro)",
+        "O JavaScript é o que dá vida ao site! Ele faz as coisas se mexerem, responderem quando você clica, mudarem sozinhas. É como o cérebro de um robô que reage quando você fala com ele.",
+        'alert("Bem-vindo ao meu site!");'
+    ),
+    (
+        'conceito',
+        "5. O que é um Bug?",
+        "Um bug é quando o código não funciona direitinho. Pode ser porque esquecemos um pedacinho, escrevemos uma palavrinha errada, ou colocamos tudo na ordem errada. É como montar um LEGO e perceber que a roda está do lado errado.",
+        None
+    )
+]
+
+
+
+# --- MIGRAÇÕES ---
+# Cada migração é aplicada uma única vez, em ordem. A versão do schema fica
+# em PRAGMA user_version. Nunca altere uma migração já publicada: crie outra.
+def _schema_inicial(cursor):
+    # CREATE ... IF NOT EXISTS: bancos antigos (sem versão) são adotados sem perder dados
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS usuarios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL,
+            idade INTEGER
+        );
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS desafios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL,
+            linguagem TEXT NOT NULL,
+            instrucao TEXT NOT NULL,
+            codigo_bugado TEXT NOT NULL,
+            codigo_esperado TEXT NOT NULL
+        );
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS progresso_usuarios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            usuario_id INTEGER NOT NULL,
+            desafio_id INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pendente',
+            data_conclusao DATETIME,
+            FOREIGN KEY (usuario_id) REFERENCES usuarios (id),
+            FOREIGN KEY (desafio_id) REFERENCES desafios (id)
+        );
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS explicacoes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tipo TEXT NOT NULL,
+            titulo TEXT NOT NULL,
+            texto TEXT NOT NULL,
+            codigo TEXT
+        );
+    """)
+
+
+def _indice_progresso(cursor):
+    # Bancos antigos podem ter linhas repetidas para o mesmo par; fica a mais recente
+    cursor.execute("""
+        DELETE FROM progresso_usuarios
+        WHERE id NOT IN (
+            SELECT MAX(id) FROM progresso_usuarios GROUP BY usuario_id, desafio_id
+        );
+    """)
+
+    # Um progresso por usuário e desafio. O mesmo índice serve o UPSERT de
+    # submeter_progresso e o LEFT JOIN de buscar_progresso (usuario_id, desafio_id)
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_progresso_usuario_desafio
+        ON progresso_usuarios (usuario_id, desafio_id);
+    """)
+
+
+def _cache_roboteca(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS respostas_roboteca (
+            chave TEXT PRIMARY KEY,
+            resposta TEXT NOT NULL,
+            criado_em REAL NOT NULL,
+            acessado_em REAL NOT NULL
+        );
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_respostas_roboteca_acessado_em
+        ON respostas_roboteca (acessado_em);
+    """)
+
+
+def _conteudo_inicial(cursor):
+    # Idempotente: só insere o que ainda não existe (pelo nome/título)
+    cursor.executemany(
+        """
+        INSERT INTO desafios (nome, linguagem, instrucao, codigo_bugado, codigo_esperado)
+        SELECT ?, ?, ?, ?, ?
+        WHERE NOT EXISTS (SELECT 1 FROM desafios WHERE nome = ?)
+        """,
+        [desafio + (desafio[0],) for desafio in DESAFIOS_INICIAIS]
+    )
+    cursor.executemany(
+        """
+        INSERT INTO explicacoes (tipo, titulo, texto, codigo)
+        SELECT ?, ?, ?, ?
+        WHERE NOT EXISTS (SELECT 1 FROM explicacoes WHERE titulo = ?)
+        """,
+        [explicacao + (explicacao[1],) for explicacao in EXPLICACOES_INICIAIS]
+    )
+
+    # Usuário de teste
+    if cursor.execute("SELECT COUNT(*) FROM usuarios").fetchone()[0] == 0:
+        cursor.execute(
+            'INSERT INTO usuarios (nome, idade) VALUES (?, ?)',
+            ('Aluno Teste', 8)
+        )
+
+
+def _estatisticas(cursor):
+    # Agregados mantidos por gatilhos, na mesma transação de quem grava o
+    # progresso (submissão, lote ou remoção de usuário)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS estatisticas_desafios (
+            desafio_id INTEGER PRIMARY KEY,
+            concluidos INTEGER NOT NULL DEFAULT 0
+        );
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS estatisticas_usuarios (
+            usuario_id INTEGER PRIMARY KEY,
+            concluidos INTEGER NOT NULL DEFAULT 0
+        );
+    """)
+    # Serve o /ranking sem ordenar a tabela inteira
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_estatisticas_usuarios_ranking
+        ON estatisticas_usuarios (concluidos DESC, usuario_id);
+    """)
+
+    _gatilhos_progresso(cursor)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_usuario_delete_estatisticas
+        AFTER DELETE ON usuarios
+        BEGIN
+            DELETE FROM estatisticas_usuarios WHERE usuario_id = OLD.id;
+        END;
+    """)
+
+    # Carga inicial a partir do progresso que já existe
+    recalcular_estatisticas(cursor)
+
+
+def _gatilhos_progresso(cursor):
+    # Mantêm estatisticas_* em dia a cada escrita em progresso_usuarios
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_progresso_concluido_insert
+        AFTER INSERT ON progresso_usuarios
+        WHEN NEW.status = 'concluido'
+        BEGIN
+            INSERT INTO estatisticas_desafios (desafio_id, concluidos) VALUES (NEW.desafio_id, 1)
+            ON CONFLICT (desafio_id) DO UPDATE SET concluidos = concluidos + 1;
+            INSERT INTO estatisticas_usuarios (usuario_id, concluidos) VALUES (NEW.usuario_id, 1)
+            ON CONFLICT (usuario_id) DO UPDATE SET concluidos = concluidos + 1;
+        END;
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_progresso_concluido_update
+        AFTER UPDATE OF status ON progresso_usuarios
+        WHEN (OLD.status = 'concluido') != (NEW.status = 'concluido')
+        BEGIN
+            INSERT INTO estatisticas_desafios (desafio_id, concluidos)
+            VALUES (NEW.desafio_id, CASE WHEN NEW.status = 'concluido' THEN 1 ELSE 0 END)
+            ON CONFLICT (desafio_id) DO UPDATE SET
+                concluidos = concluidos + CASE WHEN NEW.status = 'concluido' THEN 1 ELSE -1 END;
+            INSERT INTO estatisticas_usuarios (usuario_id, concluidos)
+            VALUES (NEW.usuario_id, CASE WHEN NEW.status = 'concluido' THEN 1 ELSE 0 END)
+            ON CONFLICT (usuario_id) DO UPDATE SET
+                concluidos = concluidos + CASE WHEN NEW.status = 'concluido' THEN 1 ELSE -1 END;
+        END;
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_progresso_concluido_delete
+        AFTER DELETE ON progresso_usuarios
+        WHEN OLD.status = 'concluido'
+        BEGIN
+            UPDATE estatisticas_desafios SET concluidos = concluidos - 1
+            WHERE desafio_id = OLD.desafio_id;
+            UPDATE estatisticas_usuarios SET concluidos = concluidos - 1
+            WHERE usuario_id = OLD.usuario_id;
+        END;
+    """)
+
+
+def recalcular_estatisticas(cursor):
+    cursor.execute("DELETE FROM estatisticas_desafios")
+    cursor.execute("DELETE FROM estatisticas_usuarios")
+    cursor.execute("""
+        INSERT INTO estatisticas_desafios (desafio_id, concluidos)
+        SELECT desafio_id, COUNT(*) FROM progresso_usuarios
+        WHERE status = 'concluido' GROUP BY desafio_id
+    """)
+    cursor.execute("""
+        INSERT INTO estatisticas_usuarios (usuario_id, concluidos)
+        SELECT usuario_id, COUNT(*) FROM progresso_usuarios
+        WHERE status = 'concluido' GROUP BY usuario_id
+    """)
+
+
+def _progresso_em_cascata(cursor):
+    # O SQLite não altera FOREIGN KEY de tabela existente: recria a tabela.
+    # Progresso de usuário ou desafio que já não existe é descartado.
+    cursor.execute("""
+        CREATE TABLE progresso_usuarios_nova (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            usuario_id INTEGER NOT NULL,
+            desafio_id INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pendente',
+            data_conclusao DATETIME,
+            FOREIGN KEY (usuario_id) REFERENCES usuarios (id) ON DELETE CASCADE,
+            FOREIGN KEY (desafio_id) REFERENCES desafios (id) ON DELETE CASCADE
+        );
+    """)
+    cursor.execute("""
+        INSERT INTO progresso_usuarios_nova (id, usuario_id, desafio_id, status, data_conclusao)
+        SELECT id, usuario_id, desafio_id, status, data_conclusao FROM progresso_usuarios
+        WHERE usuario_id IN (SELECT id FROM usuarios)
+          AND desafio_id IN (SELECT id FROM desafios)
+    """)
+    # Índice e gatilhos somem junto com a tabela antiga
+    cursor.execute("DROP TABLE progresso_usuarios")
+    cursor.execute("ALTER TABLE progresso_usuarios_nova RENAME TO progresso_usuarios")
+    cursor.execute("""
+        CREATE UNIQUE INDEX idx_progresso_usuario_desafio
+        ON progresso_usuarios (usuario_id, desafio_id);
+    """)
+    _gatilhos_progresso(cursor)
+    recalcular_estatisticas(cursor)
+
+
+def _metadados(cursor):
+    # Configurações que precisam valer para todos os processos; por enquanto,
+    # em quantos arquivos o progresso está dividido (ver shards.py)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS metadados (
+            chave TEXT PRIMARY KEY,
+            valor TEXT NOT NULL
+        );
+    """)
+    cursor.execute("INSERT OR IGNORE INTO metadados (chave, valor) VALUES ('shards', '1')")
+
+
+def _pergunta_roboteca(cursor):
+    # Guarda a dúvida junto da resposta para o índice da RoboTeca (indice_roboteca.py)
+    cursor.execute("ALTER TABLE respostas_roboteca ADD COLUMN pergunta TEXT")
+
+
+def _contexto_roboteca(cursor):
+    # Hash do contexto (chave_contexto) da resposta: o índice da RoboTeca só
+    # reaproveita uma resposta da Groq para uma dúvida feita no mesmo contexto
+    cursor.execute("ALTER TABLE respostas_roboteca ADD COLUMN contexto TEXT")
+
+
+# Trocas aplicadas na instrução dos desafios antes de indexar: os <br> e as
+# entidades de tag viram espaço (&lt;p&gt;Olá fica " p Olá", sem colar as
+# palavras) e os espaços repetidos são juntados. Em SQL puro, porque os
+# gatilhos rodam em qualquer conexão, inclusive fora da API.
+TROCAS_INSTRUCAO = (
+    ("<br>", " "), ("<br/>", " "), ("<br />", " "), ("<BR>", " "),
+    ("&lt;", " "), ("&gt;", " "), ("&quot;", '"'), ("&#39;", "'"),
+    ("&nbsp;", " "), ("&amp;", "&"),
+    ("    ", " "), ("  ", " "), ("  ", " "),
+)
+
+
+def _sql_limpar_instrucao(coluna):
+    expressao = coluna
+    for antigo, novo in TROCAS_INSTRUCAO:
+        novo = novo.replace("'", "''")
+        expressao = f"replace({expressao}, '{antigo}', '{novo}')"
+    return expressao
+
+
+def _busca_textual(cursor):
+    # Tabelas FTS5 com cópia do texto (para o snippet()) e rowid igual ao id
+    # original. remove_diacritics: "paragrafo" encontra "parágrafo".
+    for tabela, colunas in (("busca_desafios", "nome, instrucao"),
+                            ("busca_explicacoes", "titulo, texto")):
+        cursor.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {tabela} USING fts5(
+                {colunas}, tokenize = 'unicode61 remove_diacritics 2'
+            );
+        """)
+
+    cursor.execute(f"""
+        INSERT INTO busca_desafios (rowid, nome, instrucao)
+        SELECT id, nome, {_sql_limpar_instrucao("instrucao")} FROM desafios
+    """)
+    cursor.execute("""
+        INSERT INTO busca_explicacoes (rowid, titulo, texto)
+        SELECT id, titulo, texto FROM explicacoes
+    """)
+
+    # Gatilhos mantêm o índice igual às tabelas originais
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_busca_desafios_insert
+        AFTER INSERT ON desafios
+        BEGIN
+            INSERT INTO busca_desafios (rowid, nome, instrucao)
+            VALUES (NEW.id, NEW.nome, {_sql_limpar_instrucao("NEW.instrucao")});
+        END;
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_busca_desafios_update
+        AFTER UPDATE OF id, nome, instrucao ON desafios
+        BEGIN
+            DELETE FROM busca_desafios WHERE rowid = OLD.id;
+            INSERT INTO busca_desafios (rowid, nome, instrucao)
+            VALUES (NEW.id, NEW.nome, {_sql_limpar_instrucao("NEW.instrucao")});
+        END;
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_busca_desafios_delete
+        AFTER DELETE ON desafios
+        BEGIN
+            DELETE FROM busca_desafios WHERE rowid = OLD.id;
+        END;
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_busca_explicacoes_insert
+        AFTER INSERT ON explicacoes
+        BEGIN
+            INSERT INTO busca_explicacoes (rowid, titulo, texto)
+            VALUES (NEW.id, NEW.titulo, NEW.texto);
+        END;
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_busca_explicacoes_update
+        AFTER UPDATE OF id, titulo, texto ON explicacoes
+        BEGIN
+            DELETE FROM busca_explicacoes WHERE rowid = OLD.id;
+            INSERT INTO busca_explicacoes (rowid, titulo, texto)
+            VALUES (NEW.id, NEW.titulo, NEW.texto);
+        END;
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_busca_explicacoes_delete
+        AFTER DELETE ON explicacoes
+        BEGIN
+            DELETE FROM busca_explicacoes WHERE rowid = OLD.id;
+        END;
+    """)
+
+
+MIGRACOES = [
+    (1, "tabelas iniciais", _schema_inicial),
+    (2, "índice único de progresso", _indice_progresso),
+    (3, "cache das respostas da RoboTeca", _cache_roboteca),
+    (4, "desafios, explicações e usuário de teste", _conteudo_inicial),
+    (5, "agregados de conclusão por desafio e por usuário", _estatisticas),
+    (6, "progresso removido em cascata com o usuário", _progresso_em_cascata),
+    (7, "tabela de metadados", _metadados),
+    (8, "dúvida guardada junto da resposta da RoboTeca", _pergunta_roboteca),
+    (9, "busca textual (FTS5) em desafios e explicações", _busca_textual),
+    (10, "contexto guardado junto da resposta da RoboTeca", _contexto_roboteca),
+]
+
+
+# --- MIGRAÇÕES DOS SHARDS ---
+# Arquivos extras que só guardam progresso e os agregados dos seus usuários.
+# Usuários e desafios ficam no banco principal (anexado como "principal"),
+# então não há FOREIGN KEY: a remoção em cascata é feita pela API.
+def _schema_shard(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS progresso_usuarios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            usuario_id INTEGER NOT NULL,
+            desafio_id INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pendente',
+            data_conclusao DATETIME
+        );
+    """)
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_progresso_usuario_desafio
+        ON progresso_usuarios (usuario_id, desafio_id);
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS estatisticas_desafios (
+            desafio_id INTEGER PRIMARY KEY,
+            concluidos INTEGER NOT NULL DEFAULT 0
+        );
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS estatisticas_usuarios (
+            usuario_id INTEGER PRIMARY KEY,
+            concluidos INTEGER NOT NULL DEFAULT 0
+        );
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_estatisticas_usuarios_ranking
+        ON estatisticas_usuarios (concluidos DESC, usuario_id);
+    """)
+    _gatilhos_progresso(cursor)
+
+
+MIGRACOES_SHARD = [
+    (1, "progresso e agregados do shard", _schema_shard),
+]
+
+
+def versao_atual(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def aplicar_migracoes(conn, migracoes=MIGRACOES):
+    """
+    Aplica as migrações pendentes, todas em uma única transação.
+    Devolve a lista de versões aplicadas (vazia se o banco já está em dia).
+    """
+    if versao_atual(conn) >= migracoes[-1][0]:
+        return []
+
+    # BEGIN IMMEDIATE trava a escrita: se dois processos subirem juntos,
+    # o segundo espera e relê a versão já atualizada
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        versao = versao_atual(conn)
+        aplicadas = []
+        cursor = conn.cursor()
+        for numero, descricao, migracao in migracoes:
+            if numero <= versao:
+                continue
+            migracao(cursor)
+            aplicadas.append(numero)
+            print(f"Migração {numero} aplicada: {descricao}")
+
+        if aplicadas:
+            cursor.execute(f"PRAGMA user_version = {aplicadas[-1]}")
+        conn.commit()
+        return aplicadas
+    except sqlite3.Error:
+        conn.rollback()
+        raise
@@ -0,0 +1,69 @@
+import json
+
+from flask.json.provider import DefaultJSONProvider
+
+# orjson é opcional: sem ele tudo continua funcionando com o json da biblioteca padrão
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Chaves ordenadas (como o jsonify sempre fez) e chaves numéricas viram texto.
+# Datas e dataclasses passam pelo default do Flask, para sair no mesmo formato.
+if orjson is not None:
+    OPCOES_ORJSON = (
+        orjson.OPT_SORT_KEYS
+        | orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_PASSTHROUGH_DATETIME
+        | orjson.OPT_PASSTHROUGH_DATACLASS
+    )
+
+
+def serializar(dados):
+    """JSON compacto em UTF-8 (bytes), com chaves ordenadas."""
+    if orjson is not None:
+        return orjson.dumps(dados, default=DefaultJSONProvider.default, option=OPCOES_ORJSON)
+    return json.dumps(
+        dados, ensure_ascii=False, separators=(",", ":"), sort_keys=True,
+        default=DefaultJSONProvider.default
+    ).encode("utf-8")
+
+
+def cursor_de_tuplas(conn):
+    """
+    Cursor sem row_factory: as linhas vêm como tuplas simples, sem criar um
+    sqlite3.Row por linha (mais barato quando o destino é virar JSON).
+    """
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    return cursor
+
+
+def como_dicts(cursor, linhas):
+    """Monta os dicts a partir das tuplas, lendo os nomes das colunas uma vez só."""
+    colunas = [coluna[0] for coluna in cursor.description]
+    return [dict(zip(colunas, linha)) for linha in linhas]
+
+
+class ProvedorJSON(DefaultJSONProvider):
+    """
+    Provedor JSON do Flask (jsonify, request.get_json) usando o orjson quando
+    disponível. As respostas são sempre compactas, inclusive em modo debug.
+    """
+
+    ensure_ascii = False
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return serializar(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        dados = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(serializar(dados), mimetype=self.mimetype)
@@ -0,0 +1,227 @@
+import os
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from banco import DB_PATH, POOL_TAMANHO, PoolConexoes, abrir_conexao, pool
+from migracoes import MIGRACOES_SHARD, aplicar_migracoes, recalcular_estatisticas
+
+
+# Em quantos arquivos o progresso dos usuários é dividido. Com 1 (padrão)
+# tudo fica no banco principal, como sempre foi. Para mudar o número com
+# dados já gravados, rode `flask --app app rebalancear-shards --para N`.
+SHARDS = int(os.getenv("CODEBRINCANDO_SHARDS", "1"))
+
+SQL_MOVER_PROGRESSO = """
+    INSERT INTO progresso_usuarios (usuario_id, desafio_id, status, data_conclusao)
+    SELECT ?, ?, ?, ? FROM usuarios WHERE id = ?
+    ON CONFLICT (usuario_id, desafio_id) DO UPDATE SET
+        status = excluded.status,
+        data_conclusao = excluded.data_conclusao
+"""
+
+
+def caminhos_shards(total, principal=None):
+    """
+    Arquivos dos shards. Com um só é o próprio banco principal; com mais,
+    database.db vira database.shard0.db, database.shard1.db, ...
+    """
+    principal = principal or DB_PATH
+    if total == 1:
+        return [principal]
+    base, extensao = os.path.splitext(principal)
+    return [f"{base}.shard{indice}{extensao}" for indice in range(total)]
+
+
+def indice_shard(usuario_id, total):
+    """Shard de um usuário: crc32 do id (estável entre processos, ao contrário de hash())."""
+    if total == 1:
+        return 0
+    return zlib.crc32(str(int(usuario_id)).encode()) % total
+
+
+def ler_total_gravado(conn):
+    """Número de shards com que os dados foram gravados (tabela metadados)."""
+    linha = conn.execute("SELECT valor FROM metadados WHERE chave = 'shards'").fetchone()
+    return int(linha[0]) if linha else 1
+
+
+def gravar_total(conn, total):
+    conn.execute(
+        "INSERT INTO metadados (chave, valor) VALUES ('shards', ?) "
+        "ON CONFLICT (chave) DO UPDATE SET valor = excluded.valor",
+        (str(total),)
+    )
+
+
+class Shards:
+    """
+    Progresso dividido por usuario_id em vários arquivos SQLite.
+
+    Cada arquivo tem o seu próprio lock de escrita, então submissões de
+    usuários em shards diferentes gravam ao mesmo tempo. Usuários e desafios
+    continuam só no banco principal, anexado em toda conexão de shard como
+    `principal`: as consultas sem prefixo (`usuarios`, `desafios`) caem nele
+    e as de progresso/agregados ficam no shard.
+
+    Não há transação entre arquivos: cada shard é consistente sozinho.
+    """
+
+    def __init__(self, total=SHARDS, principal=None, tamanho_pool=POOL_TAMANHO):
+        self.total = total
+        self.principal = principal or DB_PATH
+        self.caminhos = caminhos_shards(total, self.principal)
+        if total == 1:
+            self.pools = [pool]
+        else:
+            self.pools = [
+                PoolConexoes(caminho, tamanho_pool, anexos={"principal": self.principal})
+                for caminho in self.caminhos
+            ]
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def indice(self, usuario_id):
+        return indice_shard(usuario_id, self.total)
+
+    def pool_do_usuario(self, usuario_id):
+        return self.pools[self.indice(usuario_id)]
+
+    def preparar(self):
+        """Aplica as migrações de shard em cada arquivo (o principal tem as suas)."""
+        if self.total == 1:
+            return
+        for pool_shard in self.pools:
+            conn = pool_shard.obter()
+            try:
+                aplicar_migracoes(conn, MIGRACOES_SHARD)
+            finally:
+                pool_shard.devolver(conn)
+
+    def _obter_executor(self):
+        # Threads do processo pai não existem no filho depois do fork
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.total, thread_name_prefix="shards"
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def em_todos(self, funcao):
+        """
+        Chama `funcao(conn)` em todos os shards ao mesmo tempo e devolve os
+        resultados na ordem dos shards. O sqlite3 solta o GIL durante a
+        consulta, então os arquivos são lidos em paralelo de verdade.
+        """
+        def executar(pool_shard):
+            conn = pool_shard.obter()
+            try:
+                return funcao(conn)
+            finally:
+                pool_shard.devolver(conn)
+
+        if self.total == 1:
+            return [executar(self.pools[0])]
+        return list(self._obter_executor().map(executar, self.pools))
+
+    def fechar_todas(self):
+        for pool_shard in self.pools:
+            pool_shard.fechar_todas()
+
+    def estatisticas(self):
+        return {
+            "total": self.total,
+            "pools": [pool_shard.estatisticas() for pool_shard in self.pools] if self.total > 1 else [],
+        }
+
+
+shards = Shards()
+
+
+# --- REBALANCEAMENTO ---
+def rebalancear(para, principal=None, tamanho_lote=1000, avisar=print):
+    """
+    Redistribui o progresso de `de` (gravado em metadados) para `para` shards.
+
+    Para rodar com a API parada. Cada linha que muda de arquivo é copiada
+    para o shard novo e só depois apagada do antigo, então uma interrupção
+    no meio não perde progresso: basta rodar de novo. No fim os agregados de
+    todos os arquivos são recalculados e o progresso de usuários que já não
+    existem é descartado.
+    """
+    principal = principal or DB_PATH
+    if para < 1:
+        raise ValueError("O número de shards precisa ser pelo menos 1.")
+
+    conn_principal = abrir_conexao(principal)
+    try:
+        de = ler_total_gravado(conn_principal)
+    finally:
+        conn_principal.close()
+
+    origens = caminhos_shards(de, principal)
+    destinos = caminhos_shards(para, principal)
+    conexoes = {}
+    try:
+        # Todo arquivo envolvido é aberto com o principal anexado, menos o próprio principal
+        for caminho in dict.fromkeys([principal] + origens + destinos):
+            if caminho == principal:
+                conexoes[caminho] = abrir_conexao(caminho)
+                continue
+            conn = abrir_conexao(caminho, {"principal": principal})
+            aplicar_migracoes(conn, MIGRACOES_SHARD)
+            conexoes[caminho] = conn
+
+        movidas = 0
+        for origem in origens:
+            conn_origem = conexoes[origem]
+            ultimo_id = 0
+            while True:
+                linhas = conn_origem.execute(
+                    "SELECT id, usuario_id, desafio_id, status, data_conclusao "
+                    "FROM progresso_usuarios WHERE id > ? ORDER BY id LIMIT ?",
+                    (ultimo_id, tamanho_lote)
+                ).fetchall()
+                if not linhas:
+                    break
+                ultimo_id = linhas[-1][0]
+
+                por_destino = {}
+                for id_linha, usuario_id, desafio_id, status, data_conclusao in linhas:
+                    destino = destinos[indice_shard(usuario_id, para)]
+                    if destino != origem:
+                        por_destino.setdefault(destino, []).append(
+                            (id_linha, (usuario_id, desafio_id, status, data_conclusao, usuario_id))
+                        )
+
+                for destino, itens in por_destino.items():
+                    # Primeiro grava no destino, depois apaga da origem
+                    with conexoes[destino] as conn_destino:
+                        conn_destino.executemany(SQL_MOVER_PROGRESSO, [valores for _, valores in itens])
+                    with conn_origem:
+                        conn_origem.executemany(
+                            "DELETE FROM progresso_usuarios WHERE id = ?",
+                            [(id_linha,) for id_linha, _ in itens]
+                        )
+                    movidas += len(itens)
+
+        for caminho, conn in conexoes.items():
+            with conn:
+                if caminho != principal:
+                    # Sem FOREIGN KEY entre arquivos: sobras de usuários removidos saem aqui
+                    conn.execute(
+                        "DELETE FROM progresso_usuarios "
+                        "WHERE usuario_id NOT IN (SELECT id FROM principal.usuarios)"
+                    )
+                recalcular_estatisticas(conn.cursor())
+
+        with conexoes[principal] as conn:
+            gravar_total(conn, para)
+
+        avisar(f"{movidas} linhas de progresso movidas de {de} para {para} shard(s).")
+        return movidas
+    finally:
+        for conn in conexoes.values():
+            conn.close()
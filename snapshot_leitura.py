@@ -0,0 +1,220 @@
+import itertools
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from banco import BUSY_TIMEOUT_MS, DB_PATH, ConexaoInstrumentada
+
+
+# Desligado por padrão: as leituras vão direto ao arquivo do banco
+SNAPSHOT_LEITURA = os.getenv("CODEBRINCANDO_SNAPSHOT_LEITURA", "0") == "1"
+# De quanto em quanto tempo a thread confere se houve commit no arquivo
+SNAPSHOT_INTERVALO_MS = int(os.getenv("CODEBRINCANDO_SNAPSHOT_INTERVALO_MS", "200"))
+# Conexões de leitura guardadas por cópia
+SNAPSHOT_POOL = int(os.getenv("CODEBRINCANDO_SNAPSHOT_POOL", "8"))
+
+# Só o que as rotas de agregados leem da cópia (/estatisticas/*, /ranking).
+# O resto do banco (progresso, cache da RoboTeca, busca) não é copiado.
+TABELAS_COPIADAS = {
+    "usuarios": ("id INTEGER PRIMARY KEY, nome TEXT NOT NULL", "id, nome"),
+    "estatisticas_desafios": ("desafio_id INTEGER PRIMARY KEY, concluidos INTEGER NOT NULL", "desafio_id, concluidos"),
+    "estatisticas_usuarios": ("usuario_id INTEGER PRIMARY KEY, concluidos INTEGER NOT NULL", "usuario_id, concluidos"),
+}
+INDICES_COPIADOS = (
+    "CREATE INDEX idx_estatisticas_usuarios_ranking ON estatisticas_usuarios (concluidos DESC, usuario_id)",
+)
+
+
+class Copia:
+    """Uma cópia do banco em memória (compartilhada entre as conexões do processo)."""
+
+    def __init__(self, numero):
+        self.numero = numero
+        self.uri = f"file:codebrincando_leitura_{os.getpid()}_{numero}?mode=memory&cache=shared"
+        # Enquanto houver uma conexão aberta para a URI, o banco em memória existe
+        self.dono = sqlite3.connect(self.uri, uri=True, check_same_thread=False)
+        self.criada_em = None
+        self.livres = queue.LifoQueue(maxsize=SNAPSHOT_POOL)
+
+
+class SnapshotLeitura:
+    """
+    Cópia do banco em memória para as rotas de leitura.
+
+    Uma thread do processo olha o `PRAGMA data_version` do arquivo a cada
+    `intervalo_ms`; quando alguém fez commit, copia as tabelas de
+    TABELAS_COPIADAS (numa única leitura do arquivo) para um banco novo em
+    memória e troca a cópia atual.
+    Quem já está lendo continua na cópia antiga até devolver a conexão, então
+    a troca nunca espera por leitores nem leitores esperam por escritores.
+
+    Os dados podem estar até um intervalo (mais o tempo da cópia) atrasados.
+    """
+
+    def __init__(self, caminho=None, intervalo_ms=SNAPSHOT_INTERVALO_MS):
+        self.caminho = caminho or DB_PATH
+        self.intervalo = intervalo_ms / 1000
+        self._lock = threading.Lock()
+        self._iniciando = threading.Lock()
+        self._atualizando = threading.Lock()
+        self._numeros = itertools.count(1)
+        self._atual = None
+        self._origem = None
+        self._versao = None
+        self._ultima_verificacao = None
+        self._thread = None
+        self._pid = None
+        self.contadores = {"atualizacoes": 0, "erros": 0}
+        self.ultima_duracao = None
+        self.ultimo_atraso = None
+
+        # Funções chamadas com (duracao, atraso, verificado_em) a cada verificação
+        # (ver metricas.py). duracao e atraso só vêm quando houve cópia nova
+        # (senão None); atraso é o limite de quão antigo pode ser o commit mais
+        # novo que a cópia ainda não tinha: o tempo desde a última verificação
+        # sem mudança. verificado_em é o último instante em que a cópia
+        # certamente batia com o arquivo.
+        self.ouvintes = []
+
+    def iniciar(self):
+        """Faz a primeira cópia e liga a thread (uma vez por processo)."""
+        # Depois de um fork a cópia e a thread do processo pai não valem no filho
+        with self._iniciando:
+            if self._pid == os.getpid():
+                return
+            # Conexão sem instrumentação: a verificação periódica não entra nas métricas de SQL
+            self._origem = sqlite3.connect(
+                self.caminho, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False
+            )
+            self._atual = None
+            self._ultima_verificacao = None
+            self.atualizar()
+            self._thread = threading.Thread(target=self._executar, name="snapshot-leitura", daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def atualizar(self):
+        """Copia as tabelas lidas pelas rotas para uma nova cópia em memória e a torna a atual."""
+        with self._atualizando:
+            inicio = time.perf_counter()
+            desde = self._ultima_verificacao or time.time()
+            versao = self._origem.execute("PRAGMA data_version").fetchone()[0]
+
+            copia = Copia(next(self._numeros))
+            self._copiar_tabelas(copia.dono)
+            copia.criada_em = time.time()
+
+            with self._lock:
+                antiga = self._atual
+                self._atual = copia
+                self._versao = versao
+                # Leitores ainda abertos seguram a cópia antiga até devolverem a conexão
+                if antiga is not None:
+                    antiga.dono.close()
+            self._ultima_verificacao = copia.criada_em
+            if antiga is not None:
+                self._fechar_livres(antiga)
+
+            duracao = time.perf_counter() - inicio
+            atraso = copia.criada_em - desde
+            with self._lock:
+                self.contadores["atualizacoes"] += 1
+                self.ultima_duracao = duracao
+                self.ultimo_atraso = atraso
+            self._avisar(duracao, atraso)
+
+    def _copiar_tabelas(self, destino):
+        destino.execute("ATTACH DATABASE ? AS origem", (self.caminho,))
+        try:
+            # Uma transação só: todas as tabelas vêm do mesmo commit do arquivo
+            destino.execute("BEGIN")
+            for tabela, (definicao, colunas) in TABELAS_COPIADAS.items():
+                destino.execute(f"CREATE TABLE main.{tabela} ({definicao})")
+                destino.execute(
+                    f"INSERT INTO main.{tabela} ({colunas}) SELECT {colunas} FROM origem.{tabela}"
+                )
+            for indice in INDICES_COPIADOS:
+                destino.execute(indice)
+            destino.execute("COMMIT")
+        finally:
+            if destino.in_transaction:
+                destino.execute("ROLLBACK")
+            destino.execute("DETACH DATABASE origem")
+
+    def _avisar(self, duracao=None, atraso=None):
+        for ouvinte in self.ouvintes:
+            ouvinte(duracao, atraso, self._ultima_verificacao)
+
+    def _executar(self):
+        while True:
+            time.sleep(self.intervalo)
+            try:
+                versao = self._origem.execute("PRAGMA data_version").fetchone()[0]
+                if versao == self._versao:
+                    self._ultima_verificacao = time.time()
+                    self._avisar()
+                    continue
+                self.atualizar()
+            except sqlite3.Error as e:
+                with self._lock:
+                    self.contadores["erros"] += 1
+                print(f"Erro ao atualizar a cópia de leitura: {e}")
+
+    def obter(self):
+        """Conexão somente leitura para a cópia atual. Devolva com `devolver()`."""
+        if self._pid != os.getpid():
+            self.iniciar()
+
+        # Sob o lock: a cópia não pode ser trocada (e o dono fechado) entre
+        # escolhê-la e abrir a conexão, senão a URI abriria um banco vazio
+        with self._lock:
+            copia = self._atual
+            try:
+                return copia.livres.get_nowait()
+            except queue.Empty:
+                conn = sqlite3.connect(
+                    copia.uri, uri=True, check_same_thread=False, factory=ConexaoInstrumentada
+                )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA query_only = ON")
+        conn.copia = copia
+        return conn
+
+    def devolver(self, conn):
+        # Sob o lock: depois da troca, nada mais entra na fila da cópia antiga
+        with self._lock:
+            if conn.copia is self._atual:
+                try:
+                    conn.copia.livres.put_nowait(conn)
+                    return
+                except queue.Full:
+                    pass
+        conn.close()
+
+    def _fechar_livres(self, copia):
+        while True:
+            try:
+                copia.livres.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def estatisticas(self):
+        with self._lock:
+            copia = self._atual
+            return {
+                "habilitado": SNAPSHOT_LEITURA,
+                "copia": copia.numero if copia else None,
+                "idade_copia_s": round(time.time() - copia.criada_em, 3) if copia else None,
+                "verificada_ha_s": (
+                    round(time.time() - self._ultima_verificacao, 3) if self._ultima_verificacao else None
+                ),
+                "ultima_duracao_ms": round(self.ultima_duracao * 1000, 2) if self.ultima_duracao is not None else None,
+                "ultimo_atraso_ms": round(self.ultimo_atraso * 1000, 2) if self.ultimo_atraso is not None else None,
+                "intervalo_ms": int(self.intervalo * 1000),
+                **self.contadores,
+            }
+
+
+snapshot_leitura = SnapshotLeitura()
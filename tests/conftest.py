@@ -0,0 +1,24 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Os módulos leem o caminho do banco do ambiente na importação: um banco
+# temporário por sessão de testes, nunca o database.db do projeto
+_PASTA = tempfile.mkdtemp(prefix="codebrincando-testes-")
+os.environ["CODEBRINCANDO_DB"] = os.path.join(_PASTA, "database.db")
+os.environ["CODEBRINCANDO_SHARDS"] = "1"
+os.environ.setdefault("CODEBRINCANDO_DOCS", "0")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def banco():
+    """Banco temporário com todas as migrações aplicadas; devolve o pool principal."""
+    from app import init_db
+    from banco import pool
+
+    init_db()
+    return pool
@@ -0,0 +1,125 @@
+import threading
+import time
+
+import pytest
+
+from groq_client import ControleConcorrencia, SobrecargaGroq
+
+
+def esperar(condicao, timeout=2.0):
+    limite = time.monotonic() + timeout
+    while not condicao():
+        if time.monotonic() > limite:
+            raise AssertionError("condição não aconteceu a tempo")
+        time.sleep(0.005)
+
+
+def em_threads(quantidade, alvo):
+    """Roda `alvo()` em várias threads e devolve o resultado (ou a exceção) de cada uma."""
+    resultados = [None] * quantidade
+
+    def rodar(indice):
+        try:
+            resultados[indice] = alvo()
+        except Exception as e:
+            resultados[indice] = e
+
+    threads = [threading.Thread(target=rodar, args=(indice,)) for indice in range(quantidade)]
+    return threads, resultados
+
+
+def test_pedidos_iguais_dividem_uma_chamada():
+    controle = ControleConcorrencia(max_simultaneas=2, max_fila=10, espera_max=1)
+    liberar = threading.Event()
+    chamadas = []
+
+    def funcao():
+        chamadas.append(1)
+        liberar.wait(2)
+        return "resposta"
+
+    threads, resultados = em_threads(4, lambda: controle.executar("chave", funcao))
+    for thread in threads:
+        thread.start()
+    esperar(lambda: controle.estatisticas()["coalescidas"] == 3)
+    liberar.set()
+    for thread in threads:
+        thread.join()
+
+    assert resultados == ["resposta"] * 4
+    assert len(chamadas) == 1
+    assert controle.estatisticas()["na_fila"] == 0
+
+
+def test_erro_do_lider_chega_aos_seguidores():
+    controle = ControleConcorrencia(max_simultaneas=2, max_fila=10, espera_max=1)
+    liberar = threading.Event()
+
+    def funcao():
+        liberar.wait(2)
+        raise ValueError("groq caiu")
+
+    threads, resultados = em_threads(3, lambda: controle.executar("chave", funcao))
+    for thread in threads:
+        thread.start()
+    esperar(lambda: controle.estatisticas()["coalescidas"] == 2)
+    liberar.set()
+    for thread in threads:
+        thread.join()
+
+    assert all(isinstance(resultado, ValueError) for resultado in resultados)
+    # A chave foi liberada: o próximo pedido chama de novo
+    assert controle.executar("chave", lambda: "de novo") == "de novo"
+
+
+def test_fila_cheia_levanta_sobrecarga():
+    controle = ControleConcorrencia(max_simultaneas=1, max_fila=1, espera_max=2)
+    liberar_vaga = controle.reservar_vaga()
+
+    threads, resultados = em_threads(1, lambda: controle.executar("outra", lambda: "ok"))
+    threads[0].start()
+    esperar(lambda: controle.estatisticas()["na_fila"] == 1)
+
+    with pytest.raises(SobrecargaGroq):
+        controle.executar("mais uma", lambda: "ok")
+
+    liberar_vaga()
+    threads[0].join()
+    assert resultados == ["ok"]
+    assert controle.estatisticas()["rejeitadas"] == 1
+
+
+def test_seguidores_contam_na_fila():
+    controle = ControleConcorrencia(max_simultaneas=1, max_fila=1, espera_max=1)
+    liberar = threading.Event()
+
+    def funcao():
+        liberar.wait(2)
+        return "resposta"
+
+    threads, resultados = em_threads(2, lambda: controle.executar("chave", funcao))
+    for thread in threads:
+        thread.start()
+        # Um por vez: o primeiro vira líder, o segundo ocupa a única vaga da fila
+        esperar(lambda: len(controle._voos) == 1)
+    esperar(lambda: controle.estatisticas()["na_fila"] == 1)
+
+    with pytest.raises(SobrecargaGroq):
+        controle.executar("chave", funcao)
+
+    liberar.set()
+    for thread in threads:
+        thread.join()
+    assert resultados == ["resposta", "resposta"]
+    assert controle.estatisticas()["na_fila"] == 0
+
+
+def test_espera_estourada_levanta_sobrecarga():
+    controle = ControleConcorrencia(max_simultaneas=1, max_fila=5, espera_max=0.05)
+    liberar_vaga = controle.reservar_vaga()
+    try:
+        with pytest.raises(SobrecargaGroq):
+            controle.executar("chave", lambda: "ok")
+    finally:
+        liberar_vaga()
+    assert controle.estatisticas()["em_andamento"] == 0
@@ -0,0 +1,146 @@
+import threading
+import time
+
+import pytest
+
+from escrita_adiada import EscritaAdiada
+
+
+@pytest.fixture
+def fila(banco):
+    escrita = EscritaAdiada(lote_max=100, intervalo_ms=20)
+    yield escrita
+    escrita.encerrar(timeout=5)
+
+
+def novo_usuario(pool, nome):
+    conn = pool.obter()
+    try:
+        with conn:
+            return conn.execute("INSERT INTO usuarios (nome) VALUES (?)", (nome,)).lastrowid
+    finally:
+        pool.devolver(conn)
+
+
+def status_gravado(pool, usuario_id, desafio_id):
+    conn = pool.obter()
+    try:
+        linha = conn.execute(
+            "SELECT status FROM progresso_usuarios WHERE usuario_id = ? AND desafio_id = ?",
+            (usuario_id, desafio_id)
+        ).fetchone()
+        return linha[0] if linha else None
+    finally:
+        pool.devolver(conn)
+
+
+def esperar(condicao, timeout=3.0):
+    limite = time.monotonic() + timeout
+    while not condicao():
+        if time.monotonic() > limite:
+            raise AssertionError("condição não aconteceu a tempo")
+        time.sleep(0.01)
+
+
+def test_pendente_aparece_ate_ser_gravado(banco, fila):
+    usuario_id = novo_usuario(banco, "Overlay")
+    # Segura a thread antes de gravar: o item fica só na memória
+    fila._gravando.acquire()
+    try:
+        assert fila.enfileirar(usuario_id, 1, "concluido", None)
+        assert fila.pendentes_do_usuario(usuario_id) == {1: "concluido"}
+        assert status_gravado(banco, usuario_id, 1) is None
+    finally:
+        fila._gravando.release()
+
+    esperar(lambda: not fila.pendentes_do_usuario(usuario_id))
+    assert status_gravado(banco, usuario_id, 1) == "concluido"
+    assert fila.estatisticas()["gravadas"] == 1
+
+
+def test_lote_que_falha_continua_no_overlay_e_e_regravado(banco, fila):
+    usuario_id = novo_usuario(banco, "Repetir")
+    original = fila._gravar_no_shard
+    falhou = threading.Event()
+    liberar = threading.Event()
+    tentativas = []
+
+    def gravar_no_shard(pool_shard, linhas):
+        tentativas.append(len(linhas))
+        if not liberar.is_set():
+            falhou.set()
+            return None
+        return original(pool_shard, linhas)
+
+    fila._gravar_no_shard = gravar_no_shard
+    fila.enfileirar(usuario_id, 1, "concluido", None)
+
+    assert falhou.wait(3)
+    esperar(lambda: fila.estatisticas()["erros"] >= 1)
+    assert fila.pendentes_do_usuario(usuario_id) == {1: "concluido"}
+
+    liberar.set()
+    esperar(lambda: not fila.pendentes_do_usuario(usuario_id))
+    assert status_gravado(banco, usuario_id, 1) == "concluido"
+    assert len(tentativas) >= 2
+    assert fila.estatisticas()["perdidas"] == 0
+
+
+def test_gravacao_direta_descarta_item_antigo_da_fila(banco, fila):
+    usuario_id = novo_usuario(banco, "Direto")
+    fila._gravando.acquire()
+    try:
+        fila.enfileirar(usuario_id, 1, "concluido", None)
+    finally:
+        fila._gravando.release()
+
+    with fila.gravando_direto([(usuario_id, 1)]):
+        conn = banco.obter()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT INTO progresso_usuarios (usuario_id, desafio_id, status) VALUES (?, 1, 'pendente') "
+                    "ON CONFLICT (usuario_id, desafio_id) DO UPDATE SET status = excluded.status",
+                    (usuario_id,)
+                )
+        finally:
+            banco.devolver(conn)
+
+    fila.encerrar(timeout=5)
+    assert status_gravado(banco, usuario_id, 1) == "pendente"
+    assert fila.estatisticas()["substituidas"] == 1
+
+
+def test_usuario_removido_conta_como_ignorado(banco, fila):
+    usuario_id = novo_usuario(banco, "Removido")
+    fila._gravando.acquire()
+    try:
+        fila.enfileirar(usuario_id, 1, "concluido", None)
+        conn = banco.obter()
+        try:
+            with conn:
+                conn.execute("DELETE FROM usuarios WHERE id = ?", (usuario_id,))
+        finally:
+            banco.devolver(conn)
+    finally:
+        fila._gravando.release()
+
+    fila.encerrar(timeout=5)
+    dados = fila.estatisticas()
+    assert dados["gravadas"] == 0
+    assert dados["ignoradas"] == 1
+    assert status_gravado(banco, usuario_id, 1) is None
+
+
+def test_fila_cheia_recusa(banco):
+    fila = EscritaAdiada(lote_max=10, intervalo_ms=20, fila_max=1)
+    fila._gravando.acquire()
+    try:
+        assert fila.enfileirar(1, 1, "pendente", None)
+        # A thread pode já ter tirado o primeiro da fila: enche até recusar
+        aceitos = sum(fila.enfileirar(1, 2, "pendente", None) for _ in range(3))
+        assert aceitos < 3
+        assert fila.estatisticas()["fila_cheia"] >= 1
+    finally:
+        fila._gravando.release()
+        fila.encerrar(timeout=5)
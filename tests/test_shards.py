@@ -0,0 +1,140 @@
+import os
+import zlib
+
+import pytest
+
+from banco import abrir_conexao
+from migracoes import aplicar_migracoes
+from shards import Shards, caminhos_shards, indice_shard, ler_total_gravado, rebalancear
+
+
+def test_indice_shard_usa_crc32_do_id():
+    for usuario_id in (1, 2, 42, 1000, 987654):
+        assert indice_shard(usuario_id, 4) == zlib.crc32(str(usuario_id).encode()) % 4
+    # O mesmo id em texto cai no mesmo shard
+    assert indice_shard("42", 4) == indice_shard(42, 4)
+    assert indice_shard(42, 1) == 0
+
+
+def test_caminhos_shards(tmp_path):
+    principal = str(tmp_path / "database.db")
+    assert caminhos_shards(1, principal) == [principal]
+    assert caminhos_shards(2, principal) == [
+        str(tmp_path / "database.shard0.db"),
+        str(tmp_path / "database.shard1.db"),
+    ]
+
+
+@pytest.fixture
+def principal(tmp_path):
+    """Banco principal novo com 20 usuários e progresso em dois desafios para cada."""
+    caminho = str(tmp_path / "database.db")
+    conn = abrir_conexao(caminho)
+    try:
+        aplicar_migracoes(conn)
+        with conn:
+            for numero in range(20):
+                usuario_id = conn.execute(
+                    "INSERT INTO usuarios (nome) VALUES (?)", (f"Aluno {numero}",)
+                ).lastrowid
+                conn.execute(
+                    "INSERT INTO progresso_usuarios (usuario_id, desafio_id, status) VALUES (?, 1, 'concluido')",
+                    (usuario_id,)
+                )
+                conn.execute(
+                    "INSERT INTO progresso_usuarios (usuario_id, desafio_id, status) VALUES (?, 2, 'pendente')",
+                    (usuario_id,)
+                )
+    finally:
+        conn.close()
+    return caminho
+
+
+def progresso_por_arquivo(caminhos):
+    linhas = {}
+    for caminho in caminhos:
+        conn = abrir_conexao(caminho)
+        try:
+            linhas[caminho] = {
+                (usuario_id, desafio_id, status)
+                for usuario_id, desafio_id, status in conn.execute(
+                    "SELECT usuario_id, desafio_id, status FROM progresso_usuarios"
+                )
+            }
+        finally:
+            conn.close()
+    return linhas
+
+
+def concluidos_por_usuario(caminho):
+    conn = abrir_conexao(caminho)
+    try:
+        return dict(conn.execute("SELECT usuario_id, concluidos FROM estatisticas_usuarios"))
+    finally:
+        conn.close()
+
+
+def test_rebalancear_ida_e_volta(principal):
+    antes = progresso_por_arquivo([principal])[principal]
+    assert len(antes) == 40
+
+    rebalancear(3, principal=principal, tamanho_lote=7, avisar=lambda mensagem: None)
+
+    destinos = caminhos_shards(3, principal)
+    por_arquivo = progresso_por_arquivo(destinos + [principal])
+    assert por_arquivo[principal] == set()
+    assert set().union(*(por_arquivo[caminho] for caminho in destinos)) == antes
+    for indice, caminho in enumerate(destinos):
+        # Cada linha está no arquivo que o crc32 do usuário escolhe
+        assert all(indice_shard(linha[0], 3) == indice for linha in por_arquivo[caminho])
+        # Os agregados de cada shard contam só os seus usuários
+        assert concluidos_por_usuario(caminho) == {linha[0]: 1 for linha in por_arquivo[caminho]}
+
+    conn = abrir_conexao(principal)
+    try:
+        assert ler_total_gravado(conn) == 3
+    finally:
+        conn.close()
+
+    # A API com 3 shards acha cada usuário no seu arquivo
+    shards = Shards(total=3, principal=principal)
+    try:
+        for usuario_id, _, _ in antes:
+            assert shards.pool_do_usuario(usuario_id).caminho == destinos[indice_shard(usuario_id, 3)]
+        totais = shards.em_todos(
+            lambda conn: conn.execute("SELECT COUNT(*) FROM progresso_usuarios").fetchone()[0]
+        )
+        assert sum(totais) == 40
+    finally:
+        shards.fechar_todas()
+
+    rebalancear(1, principal=principal, avisar=lambda mensagem: None)
+
+    por_arquivo = progresso_por_arquivo(destinos + [principal])
+    assert por_arquivo[principal] == antes
+    assert all(por_arquivo[caminho] == set() for caminho in destinos)
+    assert concluidos_por_usuario(principal) == {linha[0]: 1 for linha in antes}
+
+
+def test_rebalancear_descarta_progresso_de_usuario_removido(principal):
+    rebalancear(2, principal=principal, avisar=lambda mensagem: None)
+
+    conn = abrir_conexao(principal)
+    try:
+        with conn:
+            usuario_id = conn.execute("SELECT id FROM usuarios WHERE nome = 'Aluno 0'").fetchone()[0]
+            conn.execute("DELETE FROM usuarios WHERE id = ?", (usuario_id,))
+    finally:
+        conn.close()
+
+    rebalancear(1, principal=principal, avisar=lambda mensagem: None)
+
+    restante = progresso_por_arquivo([principal])[principal]
+    assert len(restante) == 38
+    assert all(linha[0] != usuario_id for linha in restante)
+    assert all(os.path.exists(caminho) for caminho in caminhos_shards(2, principal))
+
+
+def test_rebalancear_recusa_zero_shards(principal):
+    with pytest.raises(ValueError):
+        rebalancear(0, principal=principal)
@@ -0,0 +1,146 @@
+import re
+from html.parser import HTMLParser
+
+
+# Registro de verificadores por linguagem (coluna desafios.linguagem).
+# Cada verificador transforma um código em uma "forma normalizada" compacta;
+# duas respostas são equivalentes quando as formas normalizadas são iguais.
+VERIFICADORES = {}
+
+
+def registrar(linguagem):
+    def decorador(funcao):
+        VERIFICADORES[linguagem] = funcao
+        return funcao
+    return decorador
+
+
+def normalizar(linguagem, codigo):
+    return VERIFICADORES.get(linguagem, normalizar_texto)(codigo)
+
+
+def verificar(linguagem, codigo_submetido, gabarito):
+    """
+    Compara a submissão com o gabarito já normalizado
+    (calculado uma vez por desafio, ver catalogo.Catalogo).
+    """
+    if not isinstance(codigo_submetido, str):
+        return False
+    return normalizar(linguagem, codigo_submetido) == gabarito
+
+
+_ESPACOS = re.compile(r"\s+")
+
+
+def _colapsar_espacos(texto):
+    return _ESPACOS.sub(" ", texto).strip()
+
+
+def normalizar_texto(codigo):
+    """Padrão para linguagens sem verificador próprio: só ignora as pontas."""
+    return codigo.strip()
+
+
+# --- HTML ---
+TAGS_VAZIAS = frozenset({
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "source", "track", "wbr",
+})
+
+
+class _TokenizadorHTML(HTMLParser):
+    """
+    Quebra o HTML em tokens (abre, fecha, texto). Nomes de tags e atributos
+    já chegam em minúsculas; aspas simples/duplas e a ordem dos atributos
+    deixam de importar.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.tokens = []
+
+    def handle_starttag(self, tag, attrs):
+        atributos = tuple(sorted((nome, valor or "") for nome, valor in attrs))
+        self.tokens.append(("<", tag, atributos))
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in TAGS_VAZIAS:
+            self.tokens.append((">", tag))
+
+    def handle_endtag(self, tag):
+        if tag not in TAGS_VAZIAS:
+            self.tokens.append((">", tag))
+
+    def handle_data(self, data):
+        texto = _colapsar_espacos(data)
+        if texto:
+            self.tokens.append(("#", texto))
+
+    def handle_comment(self, data):
+        pass
+
+
+@registrar("html")
+def normalizar_html(codigo):
+    tokenizador = _TokenizadorHTML()
+    tokenizador.feed(codigo)
+    tokenizador.close()
+    return tuple(tokenizador.tokens)
+
+
+# --- CSS ---
+_COMENTARIO_CSS = re.compile(r"/\*.*?\*/", re.S)
+_COMBINADORES_CSS = re.compile(r"\s*([>+~,])\s*")
+_IMPORTANT_CSS = re.compile(r"\s*!\s*important$", re.I)
+
+
+def _normalizar_seletor(seletor):
+    seletor = _COMBINADORES_CSS.sub(r"\1", _colapsar_espacos(seletor).lower())
+    return tuple(sorted(seletor.split(",")))
+
+
+def _normalizar_valor(valor):
+    valor = _IMPORTANT_CSS.sub(" !important", _colapsar_espacos(valor))
+    # Cores, unidades e palavras-chave não diferenciam maiúsculas; strings sim
+    if '"' not in valor and "'" not in valor:
+        valor = valor.lower()
+    return _COMBINADORES_CSS.sub(r"\1", valor)
+
+
+@registrar("css")
+def normalizar_css(codigo):
+    """
+    Forma normalizada por declaração: cada regra vira (seletores, declarações),
+    onde as declarações são um conjunto propriedade -> valor (a última vence,
+    como no navegador). Espaços, ponto e vírgula final e ordem das
+    propriedades deixam de importar. CSS que não dá para entender cai na
+    comparação de texto com espaços colapsados.
+    """
+    texto = _COMENTARIO_CSS.sub(" ", codigo)
+    regras = []
+
+    blocos = texto.split("}")
+    if _colapsar_espacos(blocos[-1]):
+        return ("texto", _colapsar_espacos(codigo))
+
+    for bloco in blocos[:-1]:
+        if bloco.count("{") != 1:
+            return ("texto", _colapsar_espacos(codigo))
+
+        seletor, corpo = bloco.split("{")
+        if not seletor.strip():
+            return ("texto", _colapsar_espacos(codigo))
+
+        declaracoes = {}
+        for declaracao in corpo.split(";"):
+            if not declaracao.strip():
+                continue
+            if ":" not in declaracao:
+                return ("texto", _colapsar_espacos(codigo))
+            propriedade, valor = declaracao.split(":", 1)
+            declaracoes[_colapsar_espacos(propriedade).lower()] = _normalizar_valor(valor)
+
+        regras.append((_normalizar_seletor(seletor), frozenset(declaracoes.items())))
+
+    return ("css", tuple(regras))
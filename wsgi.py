@@ -0,0 +1,4 @@
+# Ponto de entrada WSGI usado pelo gunicorn (ver gunicorn.conf.py)
+from app import create_app
+
+app = create_app()